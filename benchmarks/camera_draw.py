@@ -0,0 +1,68 @@
+"""
+Benchmark CameraGroup.draw's fblits path against the old per-sprite Vector2 + blit loop.
+The last column is the whole draw() call, culling and sorting included.
+
+run with `python -m benchmarks.camera_draw`
+"""
+import os
+import random
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import entity
+from bush.mapping import group
+
+pygame.display.set_mode((1, 1))
+
+
+def old_draw(sprites, surface, cam_rect):
+    offset = pygame.Vector2(cam_rect.topleft)
+    for sprite in sprites:
+        pos = pygame.Vector2(sprite.rect.topleft) - offset
+        surface.blit(sprite.image, pos)
+
+
+def main(screen_size=(1280, 720)):
+    random.seed(0)
+    images = []
+    for _ in range(16):
+        image = pygame.Surface((16, 16)).convert()
+        image.fill([random.randint(0, 255) for _ in range(3)])
+        images.append(image)
+    surface = pygame.Surface(screen_size).convert()
+    print(
+        f"{'sprites':>8} {'old sprites/ms':>15} {'new sprites/ms':>15} {'speedup':>8}"
+    )
+    for count in (500, 2000, 8000):
+        camera = group.CameraGroup(screen_size, screen_size, surface.get_rect().center)
+        for _ in range(count):
+            pos = random.uniform(0, screen_size[0]), random.uniform(0, screen_size[1])
+            camera.add(entity.Entity(pos, random.choice(images)))
+        visible = camera.visible_sprites()
+        old_time = min(
+            timeit.repeat(
+                lambda: old_draw(visible, surface, camera.cam_rect), number=10, repeat=5
+            )
+        )
+        new_time = min(
+            timeit.repeat(
+                lambda: surface.fblits(camera.blit_sequence(visible)),
+                number=10,
+                repeat=5,
+            )
+        )
+        draw_time = min(
+            timeit.repeat(lambda: camera.draw(surface), number=10, repeat=5)
+        )
+        print(
+            f"{count:>8} {count * 10 / old_time / 1000:>15.0f}"
+            f" {count * 10 / new_time / 1000:>15.0f} {old_time / new_time:>8.1f}x"
+            f" {count * 10 / draw_time / 1000:>17.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
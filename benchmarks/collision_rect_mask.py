@@ -0,0 +1,73 @@
+"""
+Micro-benchmark collision.collide_rect_mask and collision.collides against the old versions,
+which built a fresh mask, offset vector and dispatch dict on every call.
+
+run with `python -m benchmarks.collision_rect_mask`
+"""
+import os
+import random
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import collision
+
+
+def old_collide_rect_mask(rect, mask, mask_pos=(0, 0)):
+    rect_mask = pygame.Mask(rect.size, True)
+    return mask.overlap(rect_mask, rect.topleft - pygame.Vector2(mask_pos))
+
+
+def old_collides(thing1, thing2):
+    type_dict = {
+        (pygame.Rect, pygame.Rect): collision.collide_rect,
+        (pygame.Mask, pygame.Mask): collision.collide_mask,
+        (pygame.Mask, pygame.Rect): lambda a, b: old_collide_rect_mask(b, a),
+        (pygame.Rect, pygame.Mask): collision.collide_mask,
+    }
+    return bool(type_dict[type(thing1), type(thing2)](thing1, thing2))
+
+
+def main(count=20000):
+    random.seed(0)
+    mask = pygame.Mask((512, 512))
+    for _ in range(40):
+        size = random.randint(8, 64), random.randint(8, 64)
+        mask.draw(
+            pygame.Mask(size, True), (random.randint(0, 512), random.randint(0, 512))
+        )
+    mask_pos = (256, 256)
+    # about half of the rects miss the mask's bounds entirely
+    rects = [
+        pygame.Rect(random.randint(-200, 1000), random.randint(-200, 1000), 16, 16)
+        for _ in range(count)
+    ]
+    cases = (
+        (
+            "collide_rect_mask",
+            lambda: [old_collide_rect_mask(rect, mask, mask_pos) for rect in rects],
+            lambda: [
+                collision.collide_rect_mask(rect, mask, mask_pos) for rect in rects
+            ],
+        ),
+        (
+            "collides (mask, rect)",
+            lambda: [old_collides(mask, rect) for rect in rects],
+            lambda: [collision.collides(mask, rect) for rect in rects],
+        ),
+    )
+    print(f"{'query':>24} {'old calls/ms':>14} {'new calls/ms':>14} {'speedup':>8}")
+    for name, old, new in cases:
+        assert [bool(i) for i in old()] == [bool(i) for i in new()]
+        old_time = min(timeit.repeat(old, number=1, repeat=5))
+        new_time = min(timeit.repeat(new, number=1, repeat=5))
+        print(
+            f"{name:>24} {count / old_time / 1000:>14.0f} {count / new_time / 1000:>14.0f}"
+            f" {old_time / new_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark dynamic_update with a plain sprite group against a BroadphaseGroup.
+
+run with `python -m benchmarks.physics_broadphase`
+"""
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import broadphase, physics
+
+
+class Body(pygame.sprite.Sprite):
+    def __init__(self, pos, type, group):
+        super().__init__()
+        self.pos = pygame.Vector2(pos)
+        self.velocity = pygame.Vector2(random.uniform(-30, 30), random.uniform(-30, 30))
+        self.rect = pygame.Rect(0, 0, 12, 12)
+        self.collision_rect = self.rect.copy()
+        self.mask = pygame.Mask(self.rect.size, True)
+        self.physics_data = physics.PhysicsData(type, group)
+        self.update_rects()
+
+    def update_rects(self):
+        self.rect.center = self.pos
+        self.collision_rect.center = self.pos
+
+    def on_collision(self, other):
+        pass
+
+
+def run(count, group_type, frames=30, map_size=2048):
+    random.seed(count)
+    group = group_type()
+    bodies = []
+    for i in range(count):
+        type = (physics.TYPE_DYNAMIC, physics.TYPE_TRIGGER)[i % 2]
+        pos = random.uniform(0, map_size), random.uniform(0, map_size)
+        body = Body(pos, type, group)
+        group.add(body)
+        if type == physics.TYPE_DYNAMIC:
+            bodies.append(body)
+    start = time.perf_counter()
+    for _ in range(frames):
+        for body in bodies:
+            physics.dynamic_update(body, 1 / 60)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    print(f"{'bodies':>8} {'linear ms':>12} {'hashed ms':>12} {'speedup':>8}")
+    for count in (50, 100, 200, 400, 800):
+        linear = run(count, pygame.sprite.Group)
+        hashed = run(count, broadphase.BroadphaseGroup)
+        print(f"{count:>8} {linear:>12.3f} {hashed:>12.3f} {linear / hashed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
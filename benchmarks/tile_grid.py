@@ -0,0 +1,142 @@
+"""
+Benchmark static collision against a tile map merged into a ChunkedMask and into a TileGrid,
+checking that bodies end up in the same places either way.
+
+run with `python -m benchmarks.tile_grid`
+"""
+import os
+import random
+import time
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import collision, physics
+
+TILE = 16
+
+
+class Body(pygame.sprite.Sprite):
+    def __init__(self, pos, velocity, group, continuous):
+        super().__init__()
+        self.pos = pygame.Vector2(pos)
+        self.velocity = pygame.Vector2(velocity)
+        self.rect = pygame.Rect(0, 0, 10, 10)
+        self.collision_rect = self.rect.copy()
+        self.physics_data = physics.PhysicsData(physics.TYPE_DYNAMIC, group, continuous)
+        self.update_rects()
+
+    def update_rects(self):
+        self.rect.center = self.pos
+        self.collision_rect.center = self.pos
+
+
+def make_tiles(size):
+    random.seed(size)
+    solid = set()
+    for _ in range(size * size // 60):
+        x, y = random.randrange(size), random.randrange(size)
+        for dy in range(random.randint(1, 6)):
+            for dx in range(random.randint(1, 6)):
+                solid.add((x + dx, y + dy))
+    slope = pygame.Mask((TILE, TILE))
+    for y in range(TILE):
+        for x in range(y + 1):
+            slope.set_at((x, y))
+    tiles = []
+    for x, y in solid:
+        if x < size and y < size:
+            mask = slope if random.random() < 0.05 else pygame.Mask((TILE, TILE), True)
+            tiles.append((x, y, mask))
+    return tiles
+
+
+def build(tiles, tile_size):
+    group = pygame.sprite.Group()
+    for x, y, mask in tiles:
+        sprite = pygame.sprite.Sprite()
+        sprite.rect = pygame.Rect(x * TILE, y * TILE, TILE, TILE)
+        sprite.mask = mask
+        sprite.physics_data = physics.PhysicsData(physics.TYPE_STATIC, group)
+        group.add(sprite)
+    physics.optimize_for_physics(group, tile_size=tile_size)
+    return group
+
+
+def run(group, count, size, frames=60):
+    random.seed(count)
+    bodies = []
+    for i in range(count):
+        pos = random.uniform(0, size * TILE), random.uniform(0, size * TILE)
+        velocity = random.uniform(-400, 400), random.uniform(-400, 400)
+        bodies.append(Body(pos, velocity, group, i % 2 == 0))
+    start = time.perf_counter()
+    for _ in range(frames):
+        for body in bodies:
+            physics.dynamic_update(body, 1 / 60)
+    elapsed = (time.perf_counter() - start) / frames * 1000
+    return elapsed, [tuple(body.pos) for body in bodies]
+
+
+def static_bytes(group):
+    total = 0
+    for sprite in group:
+        tile_grid = sprite.__dict__.get("tile_grid", None)
+        if tile_grid is not None:
+            total += len(tile_grid.flags) + len(tile_grid.shapes) * TILE * TILE // 8
+        else:
+            for chunk in sprite.chunked_mask.chunks.values():
+                width, height = chunk.get_size()
+                total += width * height // 8
+    return total
+
+
+def separate_us(group, rects):
+    """microseconds per collide + separate call for rects overlapping the static geometry"""
+    static = group.sprites()[0]
+    pos = static.rect.topleft
+    tile_grid = static.__dict__.get("tile_grid", None)
+    if tile_grid is not None:
+
+        def separate():
+            for rect in rects:
+                if tile_grid.collide_rect(rect, pos):
+                    tile_grid.separate_rect(rect, pos, 0, 1)
+
+    else:
+
+        def separate():
+            for rect in rects:
+                if collision.collide_rect_mask(rect, static.chunked_mask, pos):
+                    collision.separate_rect_mask(rect, static.chunked_mask, pos, 0, 1)
+
+    return timeit.timeit(separate, number=3) / 3 / len(rects) * 1e6
+
+
+def main(size=128, count=300):
+    tiles = make_tiles(size)
+    masked = build(tiles, None)
+    gridded = build(tiles, (TILE, TILE))
+    mask_ms, mask_positions = run(masked, count, size)
+    grid_ms, grid_positions = run(gridded, count, size)
+    random.seed(0)
+    rects = [
+        pygame.Rect(
+            random.randrange(size * TILE), random.randrange(size * TILE), 10, 10
+        )
+        for _ in range(5000)
+    ]
+    print(f"{len(tiles)} tiles, {count} bodies")
+    print(f"{'':>10} {'ms/frame':>10} {'us/separate':>12} {'bytes':>10}")
+    for name, group, ms in (("mask", masked, mask_ms), ("tile grid", gridded, grid_ms)):
+        print(
+            f"{name:>10} {ms:>10.3f} {separate_us(group, rects):>12.2f}"
+            f" {static_bytes(group):>10}"
+        )
+    print("same positions:", mask_positions == grid_positions)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ from bush import (
     ai,
     animation,
     asset_handler,
+    broadphase,
     collision,
     color,
     entity,
@@ -32,6 +33,7 @@ __all__ = (
     ai,
     animation,
     asset_handler,
+    broadphase,
     collision,
     color,
     entity,
@@ -1,3 +1,4 @@
+import copy
 import itertools
 
 import pygame
@@ -18,6 +19,10 @@ class Animation:
     def __len__(self):
         return len(self.images)
 
+    def copy(self):
+        """new animation playing the same frames, without converting them again"""
+        return copy.copy(self)
+
     def increment(self):
         self.index += 1
         self.index %= len(self.images)
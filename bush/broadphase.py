@@ -0,0 +1,213 @@
+"""
+broadphase - spatial hashing for cheap collision candidate lookup
+"""
+import math
+
+import pygame
+
+
+def body_rect(sprite):
+    """return the rect a sprite collides with (collision_rect if it has one)"""
+    rect = getattr(sprite, "collision_rect", None)
+    if rect is None:
+        return sprite.rect
+    return rect
+
+
+class SpatialHash:
+    """
+    Uniform grid that buckets items by the cells their rects touch.
+    Items spanning more than max_cells cells are kept in a separate list that every query returns,
+    so that huge things (whole-map masks) don't fill thousands of buckets.
+    """
+
+    def __init__(self, cell_size=64, max_cells=64):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells = {}
+        self.large = {}
+        self.item_cells = {}
+        self.item_rects = {}
+
+    def __len__(self):
+        return len(self.item_rects)
+
+    def __contains__(self, item):
+        return item in self.item_rects
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size if rect.width else rect.left // size,
+            (rect.bottom - 1) // size if rect.height else rect.top // size,
+        )
+
+    def add(self, item, rect):
+        rect = pygame.Rect(rect)
+        self.item_rects[item] = rect
+        left, top, right, bottom = cells = self.cell_range(rect)
+        self.item_cells[item] = cells
+        if (right - left + 1) * (bottom - top + 1) > self.max_cells:
+            self.large[item] = None
+            return
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                self.cells.setdefault((x, y), {})[item] = None
+
+    def remove(self, item):
+        rect = self.item_rects.pop(item, None)
+        if rect is None:
+            return
+        left, top, right, bottom = self.item_cells.pop(item)
+        if item in self.large:
+            del self.large[item]
+            return
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                bucket = self.cells[x, y]
+                del bucket[item]
+                if not bucket:
+                    del self.cells[x, y]
+
+    def move(self, item, rect):
+        """re-bucket an item, only touching the grid if the set of cells it covers changed"""
+        old_rect = self.item_rects.get(item, None)
+        if old_rect is None:
+            return self.add(item, rect)
+        if old_rect == rect:
+            return
+        if self.cell_range(rect) == self.item_cells[item]:
+            old_rect.update(rect)
+            return
+        self.remove(item)
+        self.add(item, rect)
+
+    def clear(self):
+        self.cells.clear()
+        self.large.clear()
+        self.item_cells.clear()
+        self.item_rects.clear()
+
+    def query(self, rect):
+        """return items whose cells overlap the rect, in insertion order per bucket.  May contain false positives"""
+        left, top, right, bottom = self.cell_range(rect)
+        found = dict(self.large)
+        cells = self.cells
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                bucket = cells.get((x, y), None)
+                if bucket:
+                    found.update(bucket)
+        return list(found)
+
+    def pairs(self):
+        """return every pair of items whose stored rects collide, each pair once"""
+        rects = self.item_rects
+        found = {}
+        large = list(self.large)
+        for bucket in self.cells.values():
+            items = list(bucket)
+            for index, item1 in enumerate(items):
+                rect1 = rects[item1]
+                for item2 in items[index + 1 :]:
+                    if rect1.colliderect(rects[item2]):
+                        found.setdefault(frozenset((item1, item2)), (item1, item2))
+        for item1 in large:
+            for item2 in self.query(rects[item1]):
+                if item2 is not item1 and rects[item1].colliderect(rects[item2]):
+                    found.setdefault(frozenset((item1, item2)), (item1, item2))
+        return list(found.values())
+
+    def query_exact(self, rect):
+        """return items whose stored rect actually collides with the rect"""
+        rect = pygame.Rect(rect)
+        rects = self.item_rects
+        return [item for item in self.query(rect) if rects[item].colliderect(rect)]
+
+    def query_point(self, point):
+        rects = self.item_rects
+        cell = (
+            math.floor(point[0] / self.cell_size),
+            math.floor(point[1] / self.cell_size),
+        )
+        found = dict(self.large)
+        found.update(self.cells.get(cell, {}))
+        return [item for item in found if rects[item].collidepoint(point)]
+
+    def nearest(self, point, max_distance=math.inf):
+        """
+        return the item whose rect center is closest to point, searching outward ring by ring of cells.
+        Returns None if nothing is within max_distance.
+        """
+        point = pygame.Vector2(point)
+        rects = self.item_rects
+        size = self.cell_size
+        center_x, center_y = math.floor(point.x / size), math.floor(point.y / size)
+        seen = set(self.large)
+        best = None
+        best_distance = max_distance
+
+        def check(item):
+            nonlocal best, best_distance
+            distance = point.distance_to(rects[item].center)
+            if distance <= best_distance:
+                best, best_distance = item, distance
+
+        for item in self.large:
+            check(item)
+        ring = 0
+        while len(seen) < len(rects) and (ring - 1) * size < best_distance:
+            for x in range(center_x - ring, center_x + ring + 1):
+                ys = (center_y - ring, center_y + ring)
+                if x in (center_x - ring, center_x + ring):
+                    ys = range(center_y - ring, center_y + ring + 1)
+                for y in ys:
+                    for item in self.cells.get((x, y), ()):
+                        if item not in seen:
+                            seen.add(item)
+                            check(item)
+            ring += 1
+        return best
+
+
+class BroadphaseGroup(pygame.sprite.Group):
+    """
+    Sprite group that keeps a spatial hash of its sprites.
+    Use as a PhysicsData.collision_group to have dynamic_update only test nearby sprites.
+    """
+
+    def __init__(self, *sprites, cell_size=64, max_cells=64):
+        self.spatial_hash = SpatialHash(cell_size, max_cells)
+        self.unindexed = {}
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        if getattr(sprite, "rect", None) is None:
+            # Entity joins its groups before it has a rect
+            self.unindexed[sprite] = None
+        else:
+            self.spatial_hash.add(sprite, body_rect(sprite))
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.spatial_hash.remove(sprite)
+        self.unindexed.pop(sprite, None)
+
+    def index_unindexed(self):
+        for sprite in list(self.unindexed):
+            if getattr(sprite, "rect", None) is not None:
+                del self.unindexed[sprite]
+                self.spatial_hash.add(sprite, body_rect(sprite))
+
+    def move(self, sprite):
+        """tell the group that a sprite moved"""
+        self.index_unindexed()
+        if sprite in self.spatial_hash:
+            self.spatial_hash.move(sprite, body_rect(sprite))
+
+    def query(self, rect):
+        self.index_unindexed()
+        return self.spatial_hash.query(rect)
@@ -1,5 +1,13 @@
+import functools
+import math
+
 import pygame
 
+try:
+    import numpy
+except ImportError:  # batch queries fall back to plain python loops
+    numpy = None
+
 
 def collide_rect(rect1, rect2):
     return rect1.colliderect(rect2)
@@ -9,16 +17,633 @@ def collide_mask(mask1, mask2):
     return mask1.overlap(mask2)
 
 
+@functools.lru_cache(maxsize=256)
+def filled_mask(size):
+    """return a shared mask of the given size with every bit set.  Don't draw on it."""
+    return pygame.Mask(size, True)
+
+
 def collide_rect_mask(rect, mask, mask_pos=(0, 0)):
-    rect_mask = pygame.Mask(rect.size, True)
-    return mask.overlap(rect_mask, rect.topleft - pygame.Vector2(mask_pos))
+    x = rect.left - mask_pos[0]
+    y = rect.top - mask_pos[1]
+    width, height = mask.get_size()
+    if x >= width or y >= height or x + rect.width <= 0 or y + rect.height <= 0:
+        return None
+    return mask.overlap(filled_mask(rect.size), (x, y))
+
+
+def clip_mask(mask, rect):
+    """return a new mask holding the part of mask (a pygame.Mask or ChunkedMask) under rect"""
+    clipped = pygame.Mask(rect.size)
+    if isinstance(mask, ChunkedMask):
+        for chunk, chunk_rect in mask.query(rect):
+            clipped.draw(
+                chunk, (chunk_rect.left - rect.left, chunk_rect.top - rect.top)
+            )
+    else:
+        clipped.draw(mask, (-rect.left, -rect.top))
+    return clipped
+
+
+def bounding_rects(mask):
+    """mask.get_bounding_rects, padding one pixel wide masks which pygame gets wrong"""
+    if mask.get_size()[0] == 1:
+        padded = pygame.Mask((2, mask.get_size()[1]))
+        padded.draw(mask, (0, 0))
+        mask = padded
+    return mask.get_bounding_rects()
+
+
+def separate_rect_mask(rect, mask, mask_pos, axis, direction):
+    """
+    return how far rect has to move along axis (in direction, 1 or -1) to stop overlapping mask.
+    The mask under a strip running ahead of the rect is flattened onto axis, and the rect goes to
+    the first gap it fits in.  The strip doubles in length until a gap is found,
+    so a deep overlap takes a few queries rather than one per pixel.
+    """
+    size = rect.size[axis]
+    reach = size
+    while True:
+        strip = rect.move(-mask_pos[0], -mask_pos[1])
+        if axis:
+            strip.height = size + reach
+        else:
+            strip.width = size + reach
+        if direction < 0:
+            strip[axis] -= reach
+        # every column (or row) between a connected piece's edges has a set bit in it
+        spans = [
+            (bounds[axis], bounds[axis] + bounds.size[axis])
+            for bounds in bounding_rects(clip_mask(mask, strip))
+        ]
+        if direction > 0:
+            edge = 0
+            for low, high in sorted(spans):
+                if low >= edge + size:
+                    break
+                edge = max(edge, high)
+            if edge + size <= size + reach:
+                return edge
+        else:
+            edge = size + reach
+            for low, high in sorted(spans, key=lambda span: -span[1]):
+                if high <= edge - size:
+                    break
+                edge = min(edge, low)
+            if edge >= size:
+                return edge - size - reach
+        reach *= 2
+
+
+def sweep_rect_mask(rect, mask, mask_pos, axis, distance):
+    """
+    return how far rect can move along axis (up to distance) before touching mask.
+    Only the strip of pixels the rect sweeps through is tested, and each hit shrinks
+    that strip, so cost grows with the distance travelled rather than with step count.
+    """
+    reach = math.ceil(abs(distance))
+    if not reach:
+        return distance
+    if distance > 0:
+        start = rect[axis] + rect.size[axis]
+        end = start + reach
+    else:
+        end = rect[axis]
+        start = end - reach
+    contact = None
+    strip = rect.copy()
+    while start < end:
+        if axis:
+            strip.top, strip.height = start, end - start
+        else:
+            strip.left, strip.width = start, end - start
+        point = mask.overlap(
+            filled_mask(strip.size),
+            (strip.left - mask_pos[0], strip.top - mask_pos[1]),
+        )
+        if point is None:
+            break
+        contact = point[axis] + mask_pos[axis]
+        if distance > 0:
+            end = contact
+        else:
+            start = contact + 1
+    if contact is None:
+        return distance
+    if distance > 0:
+        return contact - (rect[axis] + rect.size[axis])
+    return contact + 1 - rect[axis]
+
+
+COLLIDE_FUNCTIONS = {
+    (pygame.Rect, pygame.Rect): collide_rect,
+    (pygame.Mask, pygame.Mask): collide_mask,
+    (pygame.Mask, pygame.Rect): lambda mask, rect: collide_rect_mask(rect, mask),
+    (pygame.Rect, pygame.Mask): collide_rect_mask,
+}
 
 
 def collides(thing1, thing2):
-    type_dict = {
-        (pygame.Rect, pygame.Rect): collide_rect,
-        (pygame.Mask, pygame.Mask): collide_mask,
-        (pygame.Mask, pygame.Rect): lambda a, b: collide_rect_mask(b, a),
-        (pygame.Rect, pygame.Mask): collide_mask,
-    }
-    return bool(type_dict[type(thing1), type(thing2)](thing1, thing2))
+    return bool(COLLIDE_FUNCTIONS[type(thing1), type(thing2)](thing1, thing2))
+
+
+class ChunkedMask:
+    """
+    A big mask split into fixed size chunks.  Chunks with nothing in them are never stored,
+    and queries only touch the chunks that overlap the thing being tested.
+    Supports the parts of the pygame.Mask api used for collision.
+    """
+
+    def __init__(self, size, chunk_size=256):
+        self.size = tuple(size)
+        self.chunk_size = chunk_size
+        self.chunks = {}
+
+    def get_size(self):
+        return self.size
+
+    def get_rect(self, **kwargs):
+        rect = pygame.Rect((0, 0), self.size)
+        for key, value in kwargs.items():
+            setattr(rect, key, value)
+        return rect
+
+    def chunk_keys(self, rect):
+        rect = rect.clip(pygame.Rect((0, 0), self.size))
+        if not rect.width or not rect.height:
+            return
+        size = self.chunk_size
+        for x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield x, y
+
+    def chunk_rect(self, key):
+        size = self.chunk_size
+        return pygame.Rect(key[0] * size, key[1] * size, size, size).clip(
+            pygame.Rect((0, 0), self.size)
+        )
+
+    def draw(self, mask, offset):
+        rect = mask.get_rect(topleft=offset)
+        for key in self.chunk_keys(rect):
+            chunk_rect = self.chunk_rect(key)
+            chunk = self.chunks.get(key, None)
+            if chunk is None:
+                chunk = self.chunks[key] = pygame.Mask(chunk_rect.size)
+            chunk.draw(mask, (rect.left - chunk_rect.left, rect.top - chunk_rect.top))
+
+    def prune(self):
+        """drop chunks that ended up empty"""
+        for key, chunk in list(self.chunks.items()):
+            if not chunk.count():
+                del self.chunks[key]
+
+    def query(self, rect):
+        """yield (chunk mask, chunk rect) for every stored chunk overlapping the rect"""
+        for key in self.chunk_keys(rect):
+            chunk = self.chunks.get(key, None)
+            if chunk is not None:
+                yield chunk, self.chunk_rect(key)
+
+    def overlap(self, other, offset):
+        x, y = offset
+        for chunk, chunk_rect in self.query(other.get_rect(topleft=(x, y))):
+            point = chunk.overlap(other, (x - chunk_rect.left, y - chunk_rect.top))
+            if point is not None:
+                return point[0] + chunk_rect.left, point[1] + chunk_rect.top
+        return None
+
+    def overlap_area(self, other, offset):
+        x, y = offset
+        return sum(
+            chunk.overlap_area(other, (x - chunk_rect.left, y - chunk_rect.top))
+            for chunk, chunk_rect in self.query(other.get_rect(topleft=(x, y)))
+        )
+
+    def get_at(self, pos):
+        key = pos[0] // self.chunk_size, pos[1] // self.chunk_size
+        chunk = self.chunks.get(key, None)
+        if chunk is None:
+            if not pygame.Rect((0, 0), self.size).collidepoint(pos):
+                raise IndexError("position outside of mask")
+            return 0
+        chunk_rect = self.chunk_rect(key)
+        return chunk.get_at((pos[0] - chunk_rect.left, pos[1] - chunk_rect.top))
+
+    def count(self):
+        return sum(chunk.count() for chunk in self.chunks.values())
+
+    def to_mask(self):
+        """the whole thing as one pygame.Mask"""
+        mask = pygame.Mask(self.size)
+        for key, chunk in self.chunks.items():
+            mask.draw(chunk, self.chunk_rect(key).topleft)
+        return mask
+
+    def get_bounding_rects(self):
+        rects = []
+        for key, chunk in self.chunks.items():
+            chunk_rect = self.chunk_rect(key)
+            rects.extend(
+                rect.move(chunk_rect.topleft) for rect in bounding_rects(chunk)
+            )
+        return rects
+
+
+def mask_to_array(mask):
+    """return a (width, height) numpy bool array of the bits in a Mask or ChunkedMask"""
+    if isinstance(mask, ChunkedMask):
+        bits = numpy.zeros(mask.get_size(), bool)
+        for key, chunk in mask.chunks.items():
+            rect = mask.chunk_rect(key)
+            bits[rect.left : rect.right, rect.top : rect.bottom] = mask_to_array(chunk)
+        return bits
+    width, height = mask.get_size()
+    surface = pygame.Surface((width, height), depth=8)
+    surface.set_palette([(0, 0, 0), (1, 1, 1)])
+    mask.to_surface(surface, setcolor=(1, 1, 1), unsetcolor=(0, 0, 0))
+    bits = numpy.frombuffer(pygame.image.tobytes(surface, "P"), numpy.uint8)
+    return bits.reshape(height, width).T.view(bool)
+
+
+def as_array(items, width, dtype):
+    """flatten a sequence of rects or points into an (n, width) numpy array"""
+    if isinstance(items, numpy.ndarray):
+        return items.reshape(-1, width).astype(dtype, copy=False)
+    return numpy.fromiter(
+        (value for item in items for value in item), dtype, len(items) * width
+    ).reshape(-1, width)
+
+
+def cell_states(mask, origin, cell_size):
+    """
+    return (first cell, states) for the cell_size square cells a mask drawn at origin covers,
+    where states is a numpy array holding 0 for empty cells, 1 for cells with some bits set
+    and 2 for cells with every bit set
+    """
+    # rows first, the way the bits are laid out in memory
+    bits = mask_to_array(mask).T.view(numpy.uint8)
+    pad_x, pad_y = origin[0] % cell_size, origin[1] % cell_size
+    width = -(-(bits.shape[1] + pad_x) // cell_size)
+    height = -(-(bits.shape[0] + pad_y) // cell_size)
+    if bits.shape != (height * cell_size, width * cell_size):
+        grid = numpy.zeros((height * cell_size, width * cell_size), numpy.uint8)
+        grid[pad_y : pad_y + bits.shape[0], pad_x : pad_x + bits.shape[1]] = bits
+        bits = grid
+    counts = (
+        bits.reshape(height, cell_size, width, cell_size)
+        .sum(axis=3, dtype=numpy.uint16)
+        .sum(axis=1, dtype=numpy.uint16)
+    )
+    states = (counts > 0).astype(numpy.uint8)
+    states += counts == cell_size * cell_size
+    return (origin[0] // cell_size, origin[1] // cell_size), states.T
+
+
+def mask_windows(mask, size=256):
+    """
+    yield (mask, rect) for the parts of a Mask or ChunkedMask that have bits set.
+    A plain Mask is copied out size by size pixels at a time, never all at once.
+    """
+    if isinstance(mask, ChunkedMask):
+        for key, chunk in mask.chunks.items():
+            yield chunk, mask.chunk_rect(key)
+        return
+    bounds = mask.get_rect()
+    for x in range(0, bounds.width, size):
+        for y in range(0, bounds.height, size):
+            rect = pygame.Rect(x, y, size, size).clip(bounds)
+            window = clip_mask(mask, rect)
+            if window.count():
+                yield window, rect
+
+
+def occupancy(mask, cell_size):
+    """
+    return a bytearray with a byte per cell_size square cell of a Mask or ChunkedMask, stored x * rows + y.
+    Cells are 0 when empty, 1 when some bits are set and 2 when every bit is set
+    (without numpy cells are never marked full, and cells near set bits can be marked as having some).
+    """
+    width, height = mask.get_size()
+    columns, rows = -(-width // cell_size), -(-height // cell_size)
+    window_size = max(1, 256 // cell_size) * cell_size
+    if numpy is None:
+        grid = bytearray(columns * rows)
+        for window, rect in mask_windows(mask, window_size):
+            # bounding rects of connected components, so this can over-report but never miss
+            for bounds in bounding_rects(window):
+                bounds = bounds.move(rect.topleft)
+                for x in range(
+                    bounds.left // cell_size, (bounds.right - 1) // cell_size + 1
+                ):
+                    for y in range(
+                        bounds.top // cell_size, (bounds.bottom - 1) // cell_size + 1
+                    ):
+                        grid[x * rows + y] = 1
+        return grid
+    grid = numpy.zeros((columns, rows), numpy.uint8)
+    for window, rect in mask_windows(mask, window_size):
+        (x, y), states = cell_states(window, rect.topleft, cell_size)
+        states = states[: columns - x, : rows - y]
+        area = grid[x : x + states.shape[0], y : y + states.shape[1]]
+        numpy.maximum(area, states, out=area)
+    return bytearray(grid.tobytes())
+
+
+def grid_runs(solid):
+    """yield (row, start, end) for every horizontal run of true cells in a grid of rows"""
+    if numpy is None:
+        for y, row in enumerate(solid):
+            start = None
+            for x, value in enumerate(row):
+                if value and start is None:
+                    start = x
+                elif not value and start is not None:
+                    yield y, start, x
+                    start = None
+            if start is not None:
+                yield y, start, len(row)
+        return
+    solid = numpy.asarray(solid, bool)
+    edges = numpy.diff(numpy.pad(solid, ((0, 0), (1, 1))).astype(numpy.int8), axis=1)
+    rows, starts = numpy.nonzero(edges == 1)
+    _, ends = numpy.nonzero(edges == -1)
+    yield from zip(rows.tolist(), starts.tolist(), ends.tolist())
+
+
+def grid_rects(solid, cell_size=(1, 1)):
+    """
+    cover the true cells of a grid of rows with rects (in pixels), merging horizontal runs
+    with the same run in the rows below them
+    """
+    width, height = cell_size
+    rects = []
+    open_runs = {}
+    for y, start, end in grid_runs(solid):
+        rect = open_runs.get((start, end), None)
+        if rect is not None and rect.bottom == y * height:
+            rect.height += height
+            continue
+        rect = pygame.Rect(start * width, y * height, (end - start) * width, height)
+        open_runs[start, end] = rect
+        rects.append(rect)
+    return rects
+
+
+def rects_mask(rects, size):
+    mask = pygame.Mask(size)
+    for rect in rects:
+        mask.draw(filled_mask(rect.size), rect.topleft)
+    return mask
+
+
+def grid_traverse(start, direction, length, cell_size=1):
+    """
+    yield (cell x, cell y, distance entering, distance leaving) for every grid cell a ray passes through,
+    in order.  direction should be normalized.
+    """
+    x, y = start
+    dx, dy = direction
+    cell_x, cell_y = math.floor(x / cell_size), math.floor(y / cell_size)
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    if dx:
+        edge = (cell_x + (dx > 0)) * cell_size
+        next_x, delta_x = (edge - x) / dx, cell_size / abs(dx)
+    else:
+        next_x = delta_x = math.inf
+    if dy:
+        edge = (cell_y + (dy > 0)) * cell_size
+        next_y, delta_y = (edge - y) / dy, cell_size / abs(dy)
+    else:
+        next_y = delta_y = math.inf
+    distance = 0
+    while distance <= length:
+        leave = min(next_x, next_y, length)
+        yield cell_x, cell_y, distance, leave
+        if leave >= length:
+            return
+        if next_x < next_y:
+            cell_x += step_x
+            distance = next_x
+            next_x += delta_x
+        else:
+            cell_y += step_y
+            distance = next_y
+            next_y += delta_y
+
+
+class MaskIndex:
+    """
+    Snapshot of a mask set up for answering lots of queries in one call.  Rebuild it if the mask changes.
+    The index is a coarse grid of which cells have anything in them (a byte per cell),
+    built on first use from the mask a window at a time.  Queries that land in empty cells
+    are answered from the grid, and only the rest are tested against the mask itself.
+    """
+
+    def __init__(self, mask, cell_size=8):
+        self.mask = mask
+        self.size = mask.get_size()
+        self.cell_size = cell_size
+        self.columns = -(-self.size[0] // cell_size)
+        self.rows = -(-self.size[1] // cell_size)
+        self.occupied = None
+        self.occupied_sums = None
+        self.full_sums = None
+
+    def build_occupied(self):
+        if self.occupied is None:
+            self.occupied = occupancy(self.mask, self.cell_size)
+        return self.occupied
+
+    def grid(self):
+        """the occupancy grid as a (columns, rows) numpy array"""
+        return numpy.frombuffer(self.build_occupied(), numpy.uint8).reshape(
+            self.columns, self.rows
+        )
+
+    def summed(self, cells):
+        sums = numpy.zeros((self.columns + 1, self.rows + 1), numpy.int32)
+        sums[1:, 1:] = cells.cumsum(0, numpy.int32).cumsum(1)
+        return sums
+
+    def build_occupied_sums(self):
+        if self.occupied_sums is None:
+            self.occupied_sums = self.summed(self.grid() > 0)
+        return self.occupied_sums
+
+    def build_full_sums(self):
+        if self.full_sums is None:
+            self.full_sums = self.summed(self.grid() == 2)
+        return self.full_sums
+
+    @staticmethod
+    def cell_totals(sums, left, top, right, bottom):
+        """how many cells are counted in sums over each span of cells (numpy arrays, end exclusive)"""
+        right = numpy.maximum(left, right)
+        bottom = numpy.maximum(top, bottom)
+        return (
+            sums[right, bottom]
+            - sums[left, bottom]
+            - sums[right, top]
+            + sums[left, top]
+        )
+
+    def collide_rects(self, rects, offset=(0, 0)):
+        """return a list of bools, one per rect, for whether it overlaps the mask placed at offset"""
+        if numpy is None:
+            return [
+                bool(collide_rect_mask(pygame.Rect(rect), self.mask, offset))
+                for rect in rects
+            ]
+        rects = as_array(rects, 4, numpy.int64)
+        width, height = self.size
+        cell_size = self.cell_size
+        left = numpy.clip(rects[:, 0] - offset[0], 0, width)
+        top = numpy.clip(rects[:, 1] - offset[1], 0, height)
+        right = numpy.clip(rects[:, 0] + rects[:, 2] - offset[0], 0, width)
+        bottom = numpy.clip(rects[:, 1] + rects[:, 3] - offset[1], 0, height)
+        # cells the rect touches at all, and cells it covers completely
+        touched = (
+            left // cell_size,
+            top // cell_size,
+            -(-right // cell_size),
+            -(-bottom // cell_size),
+        )
+        covered = (
+            -(-left // cell_size),
+            -(-top // cell_size),
+            right // cell_size,
+            bottom // cell_size,
+        )
+        occupied_sums = self.build_occupied_sums()
+        hits = (
+            (self.cell_totals(occupied_sums, *covered) > 0)
+            | (self.cell_totals(self.build_full_sums(), *touched) > 0)
+        ) & ((right > left) & (bottom > top))
+        touched = self.cell_totals(occupied_sums, *touched)
+        for index in ((touched > 0) & ~hits).nonzero()[0].tolist():
+            hits[index] = bool(
+                collide_rect_mask(pygame.Rect(rects[index].tolist()), self.mask, offset)
+            )
+        return hits.tolist()
+
+    def collide_points(self, points, offset=(0, 0)):
+        """return a list of bools, one per point, for whether the point is set in the mask placed at offset"""
+        width, height = self.size
+        if numpy is None:
+            hits = []
+            for x, y in points:
+                x, y = math.floor(x - offset[0]), math.floor(y - offset[1])
+                hits.append(
+                    0 <= x < width
+                    and 0 <= y < height
+                    and bool(self.mask.get_at((x, y)))
+                )
+            return hits
+        grid = self.grid()
+        points = as_array(points, 2, float)
+        points = numpy.floor(points - offset).astype(numpy.int64)
+        inside = (
+            (points[:, 0] >= 0)
+            & (points[:, 0] < width)
+            & (points[:, 1] >= 0)
+            & (points[:, 1] < height)
+        )
+        candidates = inside.nonzero()[0]
+        cells = points[candidates] // self.cell_size
+        states = grid[cells[:, 0], cells[:, 1]]
+        hits = numpy.zeros(len(points), bool)
+        hits[candidates[states == 2]] = True
+        candidates = candidates[states == 1]
+        get_at = self.mask.get_at
+        for index in candidates.tolist():
+            hits[index] = get_at(points[index].tolist())
+        return hits.tolist()
+
+    def raycast(self, start, end, offset=(0, 0)):
+        """
+        return (hit point, distance) for the first set pixel on the segment from start to end,
+        or None if nothing is in the way
+        """
+        start = pygame.Vector2(start) - offset
+        delta = pygame.Vector2(end) - offset - start
+        length = delta.length()
+        direction = delta / length if length else pygame.Vector2(1, 0)
+        occupied = self.build_occupied()
+        columns, rows = self.columns, self.rows
+        width, height = self.size
+        get_at = self.mask.get_at
+        cell_size = self.cell_size
+        for cell_x, cell_y, enter, leave in grid_traverse(
+            start, direction, length, cell_size
+        ):
+            if not (
+                0 <= cell_x < columns
+                and 0 <= cell_y < rows
+                and occupied[cell_x * rows + cell_y]
+            ):
+                continue
+            point = start + direction * enter
+            for x, y, pixel_enter, _ in grid_traverse(
+                point, direction, leave - enter, 1
+            ):
+                if 0 <= x < width and 0 <= y < height and get_at((x, y)):
+                    distance = enter + pixel_enter
+                    return start + direction * distance + offset, distance
+        return None
+
+    def line_of_sight(self, start, end, offset=(0, 0)):
+        return self.raycast(start, end, offset) is None
+
+    def raycast_many(self, rays, offset=(0, 0)):
+        """
+        raycast a sequence of (start, end) pairs, returning a list of (hit point, distance) or None.
+        With numpy, rays whose bounding box holds no occupied cells are culled in one pass first.
+        """
+        rays = list(rays)
+        candidates = range(len(rays))
+        if numpy is not None and rays:
+            sums = self.build_occupied_sums()
+            ends = as_array(
+                [tuple(start) + tuple(end) for start, end in rays], 4, float
+            )
+            ends -= (offset[0], offset[1], offset[0], offset[1])
+            cells = numpy.floor(ends / self.cell_size).astype(numpy.int64)
+            width, height = sums.shape[0] - 1, sums.shape[1] - 1
+            left = numpy.clip(numpy.minimum(cells[:, 0], cells[:, 2]), 0, width)
+            right = numpy.clip(numpy.maximum(cells[:, 0], cells[:, 2]) + 1, 0, width)
+            top = numpy.clip(numpy.minimum(cells[:, 1], cells[:, 3]), 0, height)
+            bottom = numpy.clip(numpy.maximum(cells[:, 1], cells[:, 3]) + 1, 0, height)
+            total = (
+                sums[right, bottom]
+                - sums[left, bottom]
+                - sums[right, top]
+                + sums[left, top]
+            )
+            candidates = total.nonzero()[0].tolist()
+        hits = [None for _ in rays]
+        for index in candidates:
+            hits[index] = self.raycast(*rays[index], offset)
+        return hits
+
+
+def collide_rects_mask(rects, mask, mask_pos=(0, 0)):
+    """test many rects against one mask (or MaskIndex), returning a list of bools"""
+    if not isinstance(mask, MaskIndex):
+        mask = MaskIndex(mask)
+    return mask.collide_rects(rects, mask_pos)
+
+
+def raycast_mask(start, end, mask, mask_pos=(0, 0)):
+    """return (hit point, distance) of the first set pixel of a mask (or MaskIndex) between start and end"""
+    if not isinstance(mask, MaskIndex):
+        mask = MaskIndex(mask)
+    return mask.raycast(start, end, mask_pos)
+
+
+def collide_points_mask(points, mask, mask_pos=(0, 0)):
+    """test many points against one mask (or MaskIndex), returning a list of bools"""
+    if not isinstance(mask, MaskIndex):
+        mask = MaskIndex(mask)
+    return mask.collide_points(points, mask_pos)
@@ -0,0 +1,226 @@
+"""
+compiled map
+ - tmx maps packed into one binary file that is memory mapped when loaded
+"""
+import array
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+from xml.etree import ElementTree
+
+import pygame
+
+import pytmx
+from bush.mapping import tile_layer
+
+MAGIC = b"BUSHMAP1"
+HEADER = struct.Struct("<8sQ")
+EXTENSION = ".tmxc"
+
+
+def compiled_path(path):
+    return os.path.splitext(path)[0] + EXTENSION
+
+
+def align(size):
+    return (size + 7) // 8 * 8
+
+
+def file_hash(path):
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def dependencies(path):
+    """files a tmx map loads: external tilesets and every image they or the map use"""
+    found = []
+    to_scan = [path]
+    while to_scan:
+        current = to_scan.pop()
+        for element in ElementTree.parse(current).iter():
+            source = element.get("source")
+            if source is None:
+                continue
+            source = os.path.normpath(os.path.join(os.path.dirname(current), source))
+            if source not in found:
+                found.append(source)
+                if source.endswith(".tsx"):
+                    to_scan.append(source)
+    return found
+
+
+def compile_map(tmx_map, path=None, colorkey=(255, 255, 0)):
+    """
+    write a loaded map to a compiled file (by default next to the tmx) holding its tile images,
+    gid arrays, objects, and static tile layers already rendered into TileLayer chunks
+    """
+    if path is None:
+        path = compiled_path(tmx_map.filename)
+    blobs = bytearray()
+
+    def add(data):
+        offset = len(blobs)
+        blobs.extend(data)
+        blobs.extend(bytes(align(len(blobs)) - len(blobs)))
+        return offset, len(data)
+
+    tile_width, tile_height = tmx_map.tilewidth, tmx_map.tileheight
+    map_size = tmx_map.width * tile_width, tmx_map.height * tile_height
+    images = {}
+    tile_properties = {}
+    for gid, image in enumerate(tmx_map.images):
+        if image is not None:
+            images[gid] = add(pygame.image.tobytes(image, "RGBA")), image.get_size()
+        properties = tmx_map.get_tile_properties_by_gid(gid)
+        if properties:
+            tile_properties[gid] = properties
+    layers = []
+    for layer in tmx_map.layers:
+        data = {"name": layer.name, "properties": layer.properties}
+        if isinstance(layer, pytmx.TiledTileLayer):
+            rendered = tile_layer.TileLayer(map_size, colorkey=colorkey)
+            gids = array.array("I")
+            for x, y, gid in layer.iter_data():
+                gids.append(gid)
+                image = tmx_map.images[gid]
+                animated = tile_properties.get(gid, {}).get("frames")
+                if image is not None and not animated:
+                    # tiles are placed with tilewidth on both axes, same as MapLoader.parse
+                    rendered.add_tile(image, (x * tile_width, y * tile_width))
+            data["type"] = "tile"
+            data["width"] = layer.width
+            data["gids"] = add(gids.tobytes())
+            data["chunks"] = {
+                key: (
+                    add(pygame.image.tobytes(rendered.get_chunk(key), "RGB")),
+                    rendered.chunk_rect(key).size,
+                )
+                for key in rendered.tiles
+            }
+        elif isinstance(layer, pytmx.TiledImageLayer):
+            data["type"] = "image"
+            data["gid"] = layer.gid
+        else:
+            data["type"] = "object"
+            data["objects"] = [
+                {
+                    "pos": (obj.x, obj.y + obj.height) if obj.gid else (obj.x, obj.y),
+                    "gid": obj.gid,
+                    "properties": obj.properties,
+                    "type": obj.type,
+                    "name": obj.name,
+                    "width": obj.width,
+                    "height": obj.height,
+                }
+                for obj in layer
+            ]
+        layers.append(data)
+    metadata = {
+        "source": tmx_map.filename,
+        "mtime": os.path.getmtime(tmx_map.filename),
+        "depends": {
+            source: file_hash(source)
+            for source in dependencies(tmx_map.filename)
+            if os.path.exists(source)
+        },
+        "size": (tmx_map.width, tmx_map.height),
+        "tile_size": (tile_width, tile_height),
+        "properties": tmx_map.properties,
+        "images": images,
+        "tile_properties": tile_properties,
+        "colorkey": tuple(colorkey),
+        "layers": layers,
+    }
+    metadata = pickle.dumps(metadata)
+    header = HEADER.pack(MAGIC, len(metadata)) + metadata
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header)
+        file.write(bytes(align(len(header)) - len(header)))
+        file.write(blobs)
+    os.replace(temp_path, path)
+    return path
+
+
+class CompiledMap:
+    """
+    A compiled map file, memory mapped so that only the tile images and chunks that get used are read.
+    Surfaces are converted as they are asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled map")
+        self.metadata = pickle.loads(self.data[HEADER.size : HEADER.size + length])
+        self.start = align(HEADER.size + length)
+        self.filename = self.metadata["source"]
+        self.width, self.height = self.metadata["size"]
+        self.tilewidth, self.tileheight = self.metadata["tile_size"]
+        self.properties = self.metadata["properties"]
+        self.layers = self.metadata["layers"]
+        self.images = {}
+
+    def is_fresh(self):
+        """whether the source map and everything it uses are unchanged since compiling"""
+        try:
+            if os.path.getmtime(self.filename) != self.metadata["mtime"]:
+                return False
+            for source, digest in self.metadata["depends"].items():
+                if file_hash(source) != digest:
+                    return False
+        except OSError:
+            return False
+        return True
+
+    def blob(self, location):
+        offset, length = location
+        return self.data[self.start + offset : self.start + offset + length]
+
+    def get_tile_image_by_gid(self, gid):
+        if gid not in self.images:
+            image = None
+            if gid in self.metadata["images"]:
+                location, size = self.metadata["images"][gid]
+                image = pygame.image.frombytes(
+                    self.blob(location), size, "RGBA"
+                ).convert_alpha()
+            self.images[gid] = image
+        return self.images[gid]
+
+    def get_tile_properties_by_gid(self, gid):
+        return self.metadata["tile_properties"].get(gid, None)
+
+    def gids(self, layer_index):
+        return array.array("I", self.blob(self.layers[layer_index]["gids"]))
+
+    def chunk(self, layer_index, key):
+        location, size = self.layers[layer_index]["chunks"][key]
+        chunk = pygame.image.frombytes(self.blob(location), size, "RGB").convert()
+        chunk.set_colorkey(self.metadata["colorkey"])
+        return chunk
+
+    def chunk_sources(self, layer_index):
+        """chunk key -> function returning that chunk, for TileLayer.sources"""
+        return {
+            key: lambda key=key: self.chunk(layer_index, key)
+            for key in self.layers[layer_index]["chunks"]
+        }
+
+
+def load_compiled(tmx_path):
+    """return the CompiledMap for a tmx file, or None if there isn't an up to date one"""
+    path = compiled_path(tmx_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        compiled = CompiledMap(path)
+    except (OSError, ValueError, pickle.UnpicklingError, struct.error):
+        return None
+    if compiled.is_fresh():
+        return compiled
@@ -2,8 +2,12 @@
 level
  - basic mapping primitives
 """
+import math
+
 import pygame
 
+from bush import broadphase
+
 DUPLICATE_REMOVE = 1
 DUPLICATE_OVERWRITE = 2
 DUPLICATE_VALUE_ERROR = 3
@@ -39,7 +43,74 @@ class EntityGroup(pygame.sprite.Group):
         return self.ids.get(id, None)
 
 
+class SpatialGroup(EntityGroup):
+    """
+    EntityGroup that keeps its sprites' rects in a spatial hash for region, point and nearest queries.
+    The hash is resynced after update(); call moved() for sprites moved some other way.
+    """
+
+    def __init__(self, *sprites, cell_size=64, **kwargs):
+        self.spatial_hash = broadphase.SpatialHash(cell_size)
+        self.unindexed = {}
+        super().__init__(*sprites, **kwargs)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        if getattr(sprite, "rect", None) is None:
+            # Entity joins its groups before it has a rect
+            self.unindexed[sprite] = None
+        else:
+            self.spatial_hash.add(sprite, sprite.rect)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.spatial_hash.remove(sprite)
+        self.unindexed.pop(sprite, None)
+
+    def index_unindexed(self):
+        for sprite in list(self.unindexed):
+            if getattr(sprite, "rect", None) is not None:
+                del self.unindexed[sprite]
+                self.spatial_hash.add(sprite, sprite.rect)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.moved(*self.sprites())
+
+    def moved(self, *sprites):
+        self.index_unindexed()
+        for sprite in sprites:
+            if sprite in self.spatial_hash:
+                self.spatial_hash.move(sprite, sprite.rect)
+
+    def query_rect(self, rect):
+        self.index_unindexed()
+        return self.spatial_hash.query_exact(rect)
+
+    def query_point(self, point):
+        self.index_unindexed()
+        return self.spatial_hash.query_point(point)
+
+    def nearest(self, point, max_distance=math.inf):
+        self.index_unindexed()
+        return self.spatial_hash.nearest(point, max_distance)
+
+
 class CameraGroup(pygame.sprite.LayeredUpdates):
+    """
+    Draws the part of a map under the camera.
+    With spatial_culling on, sprites are kept in a spatial hash so only ones near the camera are looked at each frame.
+    The hash is resynced for sprites updated through the group and bodies in physics_world,
+    sprites moved any other way need a call to moved() or they can stay culled for good.
+    With it off (the default) every sprite is checked against the camera each frame.
+
+    With dirty_rects on, draw clears and redraws only the areas where a sprite's image or position changed
+    while the camera stood still, and returns those areas for pygame.display.update.
+    Images drawn on in place aren't noticed, set sprite.dirty = 1 for those.
+
+    Sprites with a camera_blits(cam_rect) method (like TileLayer) are drawn from the blits it returns instead of image.
+    """
+
     def __init__(
         self,
         cam_size,
@@ -49,8 +120,20 @@ class CameraGroup(pygame.sprite.LayeredUpdates):
         only_upate_visible_sprites=True,
         border_overshoot=0,
         debug_physics=False,
-        *sprites
+        *sprites,
+        physics_world=None,
+        cell_size=128,
+        dirty_rects=False,
+        background=(0, 0, 0),
+        spatial_culling=False,
     ):
+        self.spatial_culling = spatial_culling
+        self.spatial_hash = broadphase.SpatialHash(cell_size)
+        self.add_order = {}
+        self.add_count = 0
+        self.draw_order = []
+        self.unindexed = {}
+        self.self_drawing = set()
         super().__init__(*sprites)
         self.cam_rect = pygame.Rect(0, 0, *cam_size)
         self.map_rect = pygame.Rect(0, 0, *map_size)
@@ -62,6 +145,47 @@ class CameraGroup(pygame.sprite.LayeredUpdates):
             self.border_overshoot * 2, self.border_overshoot * 2
         )
         self.debug_physics = debug_physics
+        self.physics_world = physics_world
+        self.dirty_rects = dirty_rects
+        self.background = background
+        self.dirty_state = {}
+        self.last_cam_rect = None
+        self.last_surface_rect = None
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        if self.spatial_culling:
+            if getattr(sprite, "rect", None) is None:
+                # Entity joins its groups before it has a rect
+                self.unindexed[sprite] = None
+            else:
+                self.spatial_hash.add(sprite, sprite.rect)
+        if hasattr(sprite, "camera_blits"):
+            self.self_drawing.add(sprite)
+        self.add_order[sprite] = self.add_count
+        self.add_count += 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.spatial_hash.remove(sprite)
+        self.unindexed.pop(sprite, None)
+        self.self_drawing.discard(sprite)
+        self.add_order.pop(sprite, None)
+
+    def index_unindexed(self):
+        for sprite in list(self.unindexed):
+            if getattr(sprite, "rect", None) is not None:
+                del self.unindexed[sprite]
+                self.spatial_hash.add(sprite, sprite.rect)
+
+    def moved(self, *sprites):
+        """resync the spatial hash for sprites that moved"""
+        if not self.spatial_culling:
+            return
+        self.index_unindexed()
+        for sprite in sprites:
+            if sprite in self.spatial_hash:
+                self.spatial_hash.move(sprite, sprite.rect)
 
     def is_visible(self, sprite):
         if sprite in self:
@@ -71,41 +195,182 @@ class CameraGroup(pygame.sprite.LayeredUpdates):
             )
         return False
 
-    def update(self, *args, **kwargs):
+    def update_visible_rect(self):
         self.visible_rect = self.cam_rect.inflate(
             self.border_overshoot * 2, self.border_overshoot * 2
         )
+
+    def sort_sprites(self, sprites):
+        """put a subset of the sprites in drawing order, in place"""
+        layers = self._spritelayers
+        order = self.add_order
+        sprites.sort(key=lambda sprite: (layers[sprite], order[sprite]))
+
+    def visible_sprites(self):
+        """
+        return the sprites inside visible_rect in drawing order.
+        The list starts from last call's order, which is almost sorted already, and python's
+        sort is adaptive so keeping it in order costs about a linear pass over the visible sprites.
+        """
         if self.update_all:
-            return super().update(*args, **kwargs)
-        updated = []
-        for sprite in self.sprites():
-            if self.is_visible(sprite):
-                sprite.update(*args, **kwargs)
-                updated.append(sprite)
+            return self.sprites()
+        rect = self.visible_rect
+        if not self.spatial_culling:
+            return [
+                sprite
+                for sprite in self.sprites()
+                if sprite.rect.colliderect(rect)
+                or (
+                    sprite.rect.size == (0, 0)
+                    and rect.collidepoint(sprite.rect.topleft)
+                )
+            ]
+        self.index_unindexed()
+        visible = {
+            sprite: None
+            for sprite in self.spatial_hash.query(rect)
+            if sprite.rect.colliderect(rect)
+            or (sprite.rect.size == (0, 0) and rect.collidepoint(sprite.rect.topleft))
+        }
+        ordered = [sprite for sprite in self.draw_order if sprite in visible]
+        if len(ordered) < len(visible):
+            ordered_set = set(ordered)
+            ordered.extend(sprite for sprite in visible if sprite not in ordered_set)
+        self.sort_sprites(ordered)
+        self.draw_order = ordered
+        return ordered
+
+    def update(self, *args, **kwargs):
+        self.update_visible_rect()
+        if self.update_all:
+            result = super().update(*args, **kwargs)
+            self.moved(*self.sprites())
+            return result
+        updated = self.visible_sprites()
+        for sprite in updated:
+            sprite.update(*args, **kwargs)
+        self.moved(*updated)
         return updated
 
-    def draw(self, surface):
-        self.visible_rect = self.cam_rect.inflate(
-            self.border_overshoot * 2, self.border_overshoot * 2
+    def sprite_blits(self, sprite):
+        """return the (image, screen position) pairs that draw one sprite"""
+        if sprite in self.self_drawing:
+            return sprite.camera_blits(self.cam_rect)
+        pos = (
+            sprite.rect.left - self.cam_rect.left,
+            sprite.rect.top - self.cam_rect.top,
         )
+        world = self.physics_world
+        if world is not None:
+            render_x, render_y = world.render_offset(sprite)
+            pos = pos[0] + render_x, pos[1] + render_y
+        return [(sprite.image, pos)]
+
+    def blit_sequence(self, sprites):
+        """return (image, screen position) pairs for sprites, ready for Surface.fblits"""
+        if self.physics_world is None and not self.self_drawing:
+            offset_x, offset_y = self.cam_rect.topleft
+            return [
+                (
+                    sprite.image,
+                    (sprite.rect.left - offset_x, sprite.rect.top - offset_y),
+                )
+                for sprite in sprites
+            ]
+        blits = []
+        for sprite in sprites:
+            blits.extend(self.sprite_blits(sprite))
+        return blits
+
+    def draw(self, surface):
+        world = self.physics_world
+        if world is not None:
+            self.moved(*world.bodies)
         if self.follow is not None:
             self.cam_rect.center = self.follow.pos
+            if world is not None:
+                self.cam_rect.center = world.render_pos(self.follow)
             self.limit()
-            self.limit_sprites()
-        offset = pygame.Vector2(self.cam_rect.topleft)
-        for sprite in self.sprites():
-            if self.is_visible(sprite) or self.update_all:
-                pos = pygame.Vector2(sprite.rect.topleft) - offset
-                surface.blit(sprite.image, pos)
+        self.update_visible_rect()
+        visible = self.visible_sprites()
+        if self.follow is not None:
+            self.limit_sprites(visible)
+        if self.dirty_rects:
+            return self.draw_dirty(surface, visible)
+        surface.fblits(self.blit_sequence(visible))
+        self.draw_debug(surface, visible)
+
+    def draw_debug(self, surface, visible):
+        offset_x, offset_y = self.cam_rect.topleft
         if self.debug_physics:
-            for sprite in self.sprites():
-                if not sprite.no_debug and (self.is_visible(sprite) or self.update_all):
-                    pygame.draw.rect(surface, (0, 255, 0), sprite.rect.move(-offset), 1)
+            for sprite in visible:
+                if not sprite.no_debug:
+                    pygame.draw.rect(
+                        surface, (0, 255, 0), sprite.rect.move(-offset_x, -offset_y), 1
+                    )
                     if hasattr(sprite, "collision_rect"):
                         pygame.draw.rect(
-                            surface, (0, 0, 255), sprite.collision_rect.move(-offset), 1
+                            surface,
+                            (0, 0, 255),
+                            sprite.collision_rect.move(-offset_x, -offset_y),
+                            1,
                         )
 
+    def draw_dirty(self, surface, visible):
+        state = {}
+        for sprite in visible:
+            for index, (image, pos) in enumerate(self.sprite_blits(sprite)):
+                state[sprite, index] = (image, pos, image.get_size())
+        previous = self.dirty_state
+        self.dirty_state = state
+        screen_rect = surface.get_rect()
+        regions = []
+        for key, now in state.items():
+            sprite = key[0]
+            before = previous.get(key, None)
+            if now != before or getattr(sprite, "dirty", 0) == 1:
+                regions.append(pygame.Rect(now[1], now[2]))
+                if before is not None:
+                    regions.append(pygame.Rect(before[1], before[2]))
+        for sprite in visible:
+            if getattr(sprite, "dirty", 0) == 1:
+                sprite.dirty = 0
+        for key, before in previous.items():
+            if key not in state:
+                regions.append(pygame.Rect(before[1], before[2]))
+        if (
+            self.debug_physics
+            or self.cam_rect != self.last_cam_rect
+            or screen_rect != self.last_surface_rect
+        ):
+            self.last_cam_rect = self.cam_rect.copy()
+            self.last_surface_rect = screen_rect
+            regions = [screen_rect]
+        merged = []
+        for rect in regions:
+            rect = rect.clip(screen_rect)
+            if not rect.width or not rect.height:
+                continue
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect.union_ip(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        clip = surface.get_clip()
+        for rect in merged:
+            surface.set_clip(rect)
+            surface.fill(self.background, rect)
+            surface.fblits(
+                [
+                    (image, pos)
+                    for image, pos, size in state.values()
+                    if rect.colliderect(pos, size)
+                ]
+            )
+        surface.set_clip(clip)
+        self.draw_debug(surface, visible)
+        return merged
+
     def limit(self):
         if self.cam_rect.height < self.map_rect.height:
             self.cam_rect.top = max(self.cam_rect.top, self.map_rect.top)
@@ -119,14 +384,25 @@ class CameraGroup(pygame.sprite.LayeredUpdates):
         else:
             self.cam_rect.centerx = self.map_rect.centerx
 
-    def limit_sprites(self):
-        for sprite in self.sprites():
+    def limit_sprites(self, sprites=None):
+        if sprites is None:
+            sprites = self.sprites()
+        for sprite in sprites:
             sprite.limit(self.map_rect)
+        self.moved(*sprites)
 
 
 class TopDownGroup(CameraGroup):
+    def sortkey(self, sprite):
+        return (sprite.layer * 1000) + sprite.rect.bottom
+
     def sprites(self):
-        def sortkey(sprite):
-            return (sprite.layer * 1000) + sprite.rect.bottom
+        return sorted(super().sprites(), key=self.sortkey)
 
-        return sorted(super().sprites(), key=sortkey)
+    def sort_sprites(self, sprites):
+        # ties fall back to the layered order, same as sprites()
+        layers = self._spritelayers
+        order = self.add_order
+        sprites.sort(
+            key=lambda sprite: (self.sortkey(sprite), layers[sprite], order[sprite])
+        )
@@ -1,10 +1,16 @@
-from collections import namedtuple
+import os
+from collections import OrderedDict, namedtuple
 
 import pygame
 
+try:
+    import numpy
+except ImportError:  # collision grids fall back to nested lists
+    numpy = None
+
 import pytmx
-from bush import animation, asset_handler, entity, util
-from bush.mapping import registry
+from bush import animation, asset_handler, collision, entity, util
+from bush.mapping import compiled_map, registry, tile_layer
 
 TYPE_TILE = "tile"
 TYPE_OBJECT = "object"
@@ -14,7 +20,7 @@ LAYERTYPE_IMAGE = "image layer"
 LAYERTYPE_OBJECT = "object layer"
 Layer = namedtuple(
     "Layer",
-    ["layer", "pos", "image", "properties", "type", "name", "size", "items"],
+    ["layer", "pos", "image", "properties", "type", "name", "size", "items", "chunks"],
     defaults=[
         0,
         pygame.Vector2(),
@@ -24,12 +30,13 @@ Layer = namedtuple(
         None,
         pygame.Vector2(),
         [],
+        None,
     ],
 )
 Tile = namedtuple(
     "Tile",
-    ["layer", "pos", "image", "properties", "type"],
-    defaults=[0, pygame.Vector2(), pygame.Surface((0, 0)), {}, "tile"],
+    ["layer", "pos", "image", "properties", "type", "gid"],
+    defaults=[0, pygame.Vector2(), pygame.Surface((0, 0)), {}, "tile", 0],
 )
 Image = namedtuple(
     "Image",
@@ -43,6 +50,151 @@ Object = namedtuple(
 )
 
 
+def gid_grids(map):
+    """yield (layer index, gids as a grid of rows) for the tile layers of a TiledMap or CompiledMap"""
+    if isinstance(map, compiled_map.CompiledMap):
+        for index, layer in enumerate(map.layers):
+            if layer["type"] == "tile":
+                gids = map.gids(index)
+                width = layer["width"]
+                if numpy is not None:
+                    yield index, numpy.frombuffer(gids, numpy.uint32).reshape(-1, width)
+                else:
+                    yield index, [
+                        gids[i : i + width] for i in range(0, len(gids), width)
+                    ]
+        return
+    for index, layer in enumerate(map.layers):
+        if isinstance(layer, pytmx.TiledTileLayer):
+            if numpy is not None:
+                yield index, numpy.array(layer.data, numpy.uint32)
+            else:
+                yield index, layer.data
+
+
+def property_grid(map, gids, name):
+    """grid of whether each tile of a gid grid has a truthy property"""
+    if numpy is not None:
+        lookup = numpy.zeros(int(gids.max(initial=0)) + 1, bool)
+        for gid in numpy.unique(gids).tolist():
+            lookup[gid] = bool((map.get_tile_properties_by_gid(gid) or {}).get(name))
+        return lookup[gids]
+    lookup = {}
+    for row in gids:
+        for gid in row:
+            if gid not in lookup:
+                properties = map.get_tile_properties_by_gid(gid) or {}
+                lookup[gid] = bool(properties.get(name))
+    return [[lookup[gid] for gid in row] for row in gids]
+
+
+def collision_grid(map, name):
+    """grid of tiles that have a truthy property on any tile layer, or None if there are none"""
+    found = None
+    for index, gids in gid_grids(map):
+        grid = property_grid(map, gids, name)
+        if found is None:
+            found = grid
+        elif numpy is not None:
+            found = found | grid
+        else:
+            found = [
+                [old or new for old, new in zip(old_row, new_row)]
+                for old_row, new_row in zip(found, grid)
+            ]
+    if found is None or not any(any(row) for row in found):
+        return None
+    return found
+
+
+def surface_size(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+def registry_size(map_registry):
+    """approximate bytes of surfaces and masks held by a MapRegistry"""
+    seen = set()
+    total = 0
+    for group in map_registry.groups.values():
+        for sprite in group:
+            if hasattr(sprite, "memory_size"):
+                total += sprite.memory_size()
+                continue
+            image = getattr(sprite, "image", None)
+            if isinstance(image, pygame.Surface) and id(image) not in seen:
+                seen.add(id(image))
+                total += surface_size(image)
+    for mask in map_registry.masks.values():
+        width, height = mask.get_size()
+        total += width * height // 8
+    return total
+
+
+class MapCache:
+    """
+    Least recently used cache of loaded maps.
+    Once the maps in it take more than max_bytes (as guessed by registry_size) the oldest ones are dropped,
+    though the newest map is always kept.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, fallback=None):
+        if key not in self.entries:
+            self.misses += 1
+            return fallback
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, map_registry, properties):
+        self.entries[key] = (map_registry, properties)
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def remove(self, key):
+        self.entries.pop(key, None)
+        self.sizes.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+
+    def size(self):
+        return sum(self.sizes.values())
+
+    def evict(self):
+        # sizes are remeasured each time since tile layers render chunks lazily
+        for key, (map_registry, properties) in self.entries.items():
+            self.sizes[key] = registry_size(map_registry)
+        while len(self.entries) > 1 and self.size() > self.max_bytes:
+            key, _ = self.entries.popitem(last=False)
+            del self.sizes[key]
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "maps": len(self.entries),
+            "bytes": self.size(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
 class MapLoader:
     def __init__(
         self,
@@ -60,6 +212,9 @@ class MapLoader:
         tile_handler=lambda tile, sprite_group: None,
         registry_creators=None,
         colorkey=(255, 255, 0),
+        cache_bytes=64 * 1024 * 1024,
+        compile_maps=False,
+        collision_properties=(),
     ):
         self.registry_creators = registry_creators
         if registry_creators is None:
@@ -67,16 +222,23 @@ class MapLoader:
                 "main": pygame.sprite.Group,
             }
         self.loader = asset_handler.AssetHandler(base_dir)
-        self.cache = {}
+        self.cache = MapCache(cache_bytes)
         self.cache_maps = cache_maps
         self.cache_files = cache_files
+        self.compile_maps = compile_maps
+        self.collision_properties = collision_properties
         self.sprite_creator = sprite_creator
         self.tile_handler = tile_handler
         self.colorkey = colorkey
         self.current_registry = None
 
     def parse(self, map):
+        # gids already include flip flags, so they are enough to key the converted frames
+        animations = {}
+
         def get_anim(tmx_map, gid):
+            if gid in animations:
+                return animations[gid].copy()
             props = tmx_map.get_tile_properties_by_gid(gid)
             anim = tmx_map.get_tile_image_by_gid(gid)
             if props is not None and props["frames"]:
@@ -86,6 +248,8 @@ class MapLoader:
                     frames.append(tmx_map.get_tile_image_by_gid(frame.gid))
                     durations.append(frame.duration)
                 anim = animation.Animation(frames, durations)
+                animations[gid] = anim
+                return anim.copy()
             return anim
 
         def tile_generator(tmx_map, layer_index):
@@ -96,6 +260,7 @@ class MapLoader:
                     pygame.Vector2(x * map.tilewidth, y * map.tilewidth),
                     get_anim(tmx_map, gid),
                     map.get_tile_properties_by_gid(gid) or {},
+                    gid=gid,
                 )
 
         def image_generator(tmx_map, layer_index):
@@ -132,11 +297,81 @@ class MapLoader:
                     height=obj.height,
                 )
 
+        def compiled_tile_generator(compiled, layer_index):
+            width = compiled.layers[layer_index]["width"]
+            for index, gid in enumerate(compiled.gids(layer_index)):
+                y, x = divmod(index, width)
+                yield Tile(
+                    layer_index,
+                    pygame.Vector2(x * map.tilewidth, y * map.tilewidth),
+                    get_anim(compiled, gid),
+                    compiled.get_tile_properties_by_gid(gid) or {},
+                    gid=gid,
+                )
+
+        def compiled_image_generator(compiled, layer_index):
+            layer = compiled.layers[layer_index]
+            yield Image(
+                layer_index,
+                image=compiled.get_tile_image_by_gid(layer["gid"]),
+                properties=layer["properties"],
+                name=layer["name"],
+            )
+
+        def compiled_object_generator(compiled, layer_index):
+            for obj in compiled.layers[layer_index]["objects"]:
+                if obj["gid"]:
+                    yield Object(
+                        layer_index,
+                        pygame.Vector2(obj["pos"]),
+                        get_anim(compiled, obj["gid"]),
+                        obj["properties"],
+                        obj["type"],
+                        obj["name"],
+                        obj["width"],
+                        obj["height"],
+                    )
+                    continue
+                yield Object(
+                    layer_index,
+                    pygame.Vector2(obj["pos"]),
+                    properties=obj["properties"],
+                    type=obj["type"],
+                    name=obj["name"],
+                    width=obj["width"],
+                    height=obj["height"],
+                )
+
         if isinstance(map, str):
             map: pytmx.TiledMap = self.loader.load(map, self.cache_files)
         map_size = pygame.Vector2(
             map.tilewidth * map.width, map.tileheight * map.height
         )
+        if isinstance(map, compiled_map.CompiledMap):
+            type_dict = {
+                "tile": LAYERTYPE_TILE,
+                "image": LAYERTYPE_IMAGE,
+                "object": LAYERTYPE_OBJECT,
+            }
+            parser_dict = {
+                LAYERTYPE_TILE: compiled_tile_generator,
+                LAYERTYPE_IMAGE: compiled_image_generator,
+                LAYERTYPE_OBJECT: compiled_object_generator,
+            }
+            for index, layer in enumerate(map.layers):
+                layer_type = type_dict[layer["type"]]
+                yield Layer(
+                    index,
+                    properties=layer["properties"],
+                    type=layer_type,
+                    items=parser_dict[layer_type](map, index),
+                    name=layer["name"],
+                    size=map_size.copy(),
+                    chunks=map.chunk_sources(index)
+                    if layer_type == LAYERTYPE_TILE
+                    else None,
+                )
+            return
         type_dict = {
             pytmx.TiledTileLayer: LAYERTYPE_TILE,
             pytmx.TiledImageLayer: LAYERTYPE_IMAGE,
@@ -162,59 +397,105 @@ class MapLoader:
         self,
         map,
     ):
-        if not isinstance(map, pytmx.TiledMap):
-            map = self.loader.load(map, self.cache_files)
+        for result in self.load_steps(map):
+            pass
+        # only foreground loads change current_registry, not maps streamed in with load_steps
+        self.current_registry = result[0]
+        return result
+
+    def load_steps(self, map, step_size=256):
+        """
+        load a map a bit at a time, yielding None after every step_size tiles or objects
+        and then the same tuple load returns.
+        """
+        if isinstance(map, (pytmx.TiledMap, compiled_map.CompiledMap)):
+            filepath = map.filename
+        else:
+            filepath = os.path.join(self.loader.base, map)
+        if self.cache_maps:
+            cached = self.cache.get(filepath)
+            if cached is not None:
+                map_registry, properties = cached
+                yield map_registry, properties, True
+                return
+
+        if not isinstance(map, (pytmx.TiledMap, compiled_map.CompiledMap)):
+            compiled = compiled_map.load_compiled(filepath)
+            if compiled is None:
+                map = self.loader.load(map, self.cache_files)
+                if self.compile_maps:
+                    compiled_map.compile_map(map, colorkey=self.colorkey)
+            else:
+                map = compiled
         map_size = pygame.Vector2(
             map.width * map.tilewidth, map.height * map.tileheight
         )
 
-        filepath = map.filename
-        if filepath in self.cache:
-            return self.cache[filepath]
-
         layers = self.parse(map)
-        self.current_registry = registry.MapRegistry()
+        map_registry = registry.MapRegistry()
         for group_name, group_creator in self.registry_creators.items():
-            self.current_registry.add_group(group_name, group_creator(map_size))
+            map_registry.add_group(group_name, group_creator(map_size))
+        count = 0
         for layer in layers:
             if layer.type == LAYERTYPE_TILE:
-                surface = pygame.Surface(layer.size).convert()
-                surface.fill(self.colorkey)
-                surface.set_colorkey(self.colorkey)
-                for tile in layer.items:
-                    self.tile_handler(tile, self.current_registry)
-                    try:
-                        surface.blit(tile.image, tile.pos)
-                    except TypeError:
-                        self.current_registry.get_group("main").add(
-                            entity.Entity(
-                                tile.pos,
-                                tile.image,
-                                layer=layer.layer * 3 + 1,
-                                topleft=True,
-                            )
-                        )
-
-                sprite = entity.Entity(
-                    (0, 0), surface, layer=layer.layer * 3 + 1, topleft=True
+                sprite = tile_layer.TileLayer(
+                    layer.size, layer=layer.layer * 3 + 1, colorkey=self.colorkey
+                )
+                animated = tile_layer.AnimatedTileLayer(
+                    layer.size, layer=layer.layer * 3 + 1, colorkey=self.colorkey
                 )
-                self.current_registry.get_group("main").add(sprite)
+                if layer.chunks:
+                    sprite.sources.update(layer.chunks)
+                for tile in layer.items:
+                    self.tile_handler(tile, map_registry)
+                    if isinstance(tile.image, pygame.Surface):
+                        if not layer.chunks:
+                            sprite.add_tile(tile.image, tile.pos)
+                    elif isinstance(tile.image, animation.Animation):
+                        animated.add_tile(tile.gid, tile.image, tile.pos)
+                    count += 1
+                    if not count % step_size:
+                        yield None
+                if animated.anims:
+                    map_registry.get_group("main").add(animated)
+                map_registry.get_group("main").add(sprite)
             if layer.type == LAYERTYPE_IMAGE:
-                self.current_registry.get_group("main").add(
+                map_registry.get_group("main").add(
                     entity.Entity(
                         (0, 0), layer.image, layer=layer.layer * 3 + 1, id=layer.name
                     )
                 )
             if layer.type == LAYERTYPE_OBJECT:
                 for obj in layer.items:
-                    self.sprite_creator(obj, self.current_registry.get_group("main"))
+                    self.sprite_creator(obj, map_registry.get_group("main"))
+                    count += 1
+                    if not count % step_size:
+                        yield None
+        self.build_collision(map, map_registry)
         if self.cache_maps:
-            self.cache[filepath] = (
-                self.current_registry.get_group("main"),
-                map.properties,
-                True,
-            )
-        return self.current_registry, map.properties, False
+            self.cache.put(filepath, map_registry, map.properties)
+        yield map_registry, map.properties, False
+
+    def build_collision(self, map, map_registry):
+        """
+        register a rect list and mask under each name in collision_properties,
+        covering every tile (on any tile layer) with that property set.
+        Anything tile_handler already registered under a name is left alone.
+        """
+        size = map.width * map.tilewidth, map.height * map.tileheight
+        for name in self.collision_properties:
+            has_rects = map_registry.get_rect_list(name) is not None
+            has_mask = map_registry.get_mask(name) is not None
+            if has_rects and has_mask:
+                continue
+            grid = collision_grid(map, name)
+            if grid is None:
+                continue
+            rects = collision.grid_rects(grid, (map.tilewidth, map.tileheight))
+            if not has_rects:
+                map_registry.add_rect_list(name, rects)
+            if not has_mask:
+                map_registry.add_mask(name, collision.rects_mask(rects, size))
 
     def clear_cache(self):
         self.cache.clear()
@@ -1,13 +1,34 @@
 import pygame
 
-from bush import collision
+from bush import broadphase, collision
+from bush.mapping import group as group_module
 
 
 class MaskRegistry(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.indexes = {}
+
     def __setitem__(self, key, value):
         if not isinstance(value, pygame.Mask):
             raise TypeError("MaskRegistry only accepts pygame.Mask objects")
         super().__setitem__(key, value)
+        self.indexes.pop(key, None)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.indexes.pop(key, None)
+
+    def get_index(self, key):
+        """return a collision.MaskIndex for the mask under key, built on first use"""
+        index = self.indexes.get(key, None)
+        if index is None:
+            index = self.indexes[key] = collision.MaskIndex(self[key])
+        return index
+
+    def refresh(self, key):
+        """call after drawing onto a registered mask so batch queries see the change"""
+        self.indexes.pop(key, None)
 
     def collides(self, thing, *keys):
         for key in keys:
@@ -24,30 +45,123 @@ class MaskRegistry(dict):
             if self[key].overlap(mask, offset):
                 return key
 
+    def collide_rects(self, rects, *keys):
+        """return a list of bools for which rects hit any of the masks under keys"""
+        hits = None
+        for key in keys:
+            key_hits = self.get_index(key).collide_rects(rects)
+            hits = (
+                key_hits if hits is None else [a or b for a, b in zip(hits, key_hits)]
+            )
+        return hits or [False for _ in rects]
+
+    def collide_points(self, points, *keys):
+        """return a list of bools for which points are set in any of the masks under keys"""
+        hits = None
+        for key in keys:
+            key_hits = self.get_index(key).collide_points(points)
+            hits = (
+                key_hits if hits is None else [a or b for a, b in zip(hits, key_hits)]
+            )
+        return hits or [False for _ in points]
+
+    def raycast(self, start, end, *keys):
+        """return (hit point, distance, key) for the nearest hit among the masks under keys, or None"""
+        nearest = None
+        for key in keys:
+            hit = self.get_index(key).raycast(start, end)
+            if hit is not None and (nearest is None or hit[1] < nearest[1]):
+                nearest = (*hit, key)
+        return nearest
+
+    def raycast_many(self, rays, *keys):
+        rays = list(rays)
+        nearest = [None for _ in rays]
+        for key in keys:
+            for index, hit in enumerate(self.get_index(key).raycast_many(rays)):
+                if hit is not None and (
+                    nearest[index] is None or hit[1] < nearest[index][1]
+                ):
+                    nearest[index] = (*hit, key)
+        return nearest
+
+    def line_of_sight(self, start, end, *keys):
+        return self.raycast(start, end, *keys) is None
+
+    def sweep_rect(self, rect, axis, distance, *keys):
+        for key in keys:
+            distance = collision.sweep_rect_mask(
+                rect, self[key], (0, 0), axis, distance
+            )
+        return distance
+
 
 class RectListRegistry(dict):
+    """
+    Rect lists are put in a spatial hash when they are registered, so queries only test nearby rects.
+    Reassign the list after changing it so the index is rebuilt.
+    """
+
+    def __init__(self, *args, cell_size=64, **kwargs):
+        super().__init__()
+        self.cell_size = cell_size
+        self.indexes = {}
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
     def __setitem__(self, key, value):
         if not isinstance(value, (list, tuple, set)):
             raise TypeError("RectListRegistry only takes sequences")
         super().__setitem__(key, value)
+        rects = [pygame.Rect(rect) for rect in value]
+        index = broadphase.SpatialHash(self.cell_size)
+        for rect_index, rect in enumerate(rects):
+            index.add(rect_index, rect)
+        self.indexes[key] = rects, index
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        del self.indexes[key]
+
+    def query(self, rect, key):
+        """return the rects under key whose cells touch rect"""
+        rects, index = self.indexes[key]
+        return [rects[rect_index] for rect_index in index.query(rect)]
+
+    def bounds(self, thing, offset=(0, 0)):
+        if isinstance(thing, pygame.Rect):
+            return thing
+        return thing.get_rect(topleft=offset)
 
     def collides(self, thing, *keys):
+        bounds = self.bounds(thing)
         for key in keys:
-            for rect in self[key]:
+            for rect in self.query(bounds, key):
                 if collision.collides(rect, thing):
                     return key
 
     def collide_rect(self, rect, *keys):
         for key in keys:
-            if rect.collidelist(self[key]):
+            if rect.collidelist(self.query(rect, key)) != -1:
                 return key
 
     def collide_mask(self, mask, offset, *keys):
+        bounds = self.bounds(mask, offset)
         for key in keys:
-            for rect in self[key]:
+            for rect in self.query(bounds, key):
                 if collision.collide_rect_mask(rect, mask, offset):
                     return key
 
+    def collide_all(self, thing, *keys):
+        """return every (key, rect) pair that collides with thing (a rect or a mask at the origin)"""
+        bounds = self.bounds(thing)
+        return [
+            (key, rect)
+            for key in keys
+            for rect in self.query(bounds, key)
+            if collision.collides(rect, thing)
+        ]
+
 
 class GroupRegistry(dict):
     def __setitem__(self, key, value):
@@ -55,15 +169,26 @@ class GroupRegistry(dict):
             raise TypeError("GroupRegistry only takes pygame sprite groups")
         super().__setitem__(key, value)
 
+    def candidates(self, rect, key):
+        group = self[key]
+        if isinstance(group, group_module.SpatialGroup):
+            return group.query_rect(rect)
+        return group.sprites()
+
     def collides(self, thing, *keys):
+        bounds = thing if isinstance(thing, pygame.Rect) else thing.get_rect()
         for key in keys:
-            for sprite in self[key].sprites():
-                if collision.collides(sprite, thing):
+            for sprite in self.candidates(bounds, key):
+                if collision.collides(sprite.rect, thing):
                     return key
 
     def collide_sprite(self, sprite, callback, *keys):
         for key in keys:
-            if pygame.sprite.spritecollideany(sprite, self[key], callback):
+            # callbacks like collide_circle can hit sprites whose rects don't overlap
+            if callback is None and isinstance(self[key], group_module.SpatialGroup):
+                if self.candidates(sprite.rect, key):
+                    return key
+            elif pygame.sprite.spritecollideany(sprite, self[key], callback):
                 return key
 
 
@@ -0,0 +1,251 @@
+"""
+tile layer
+ - static tile layers rendered in chunks on demand
+"""
+from collections import OrderedDict
+
+import pygame
+
+from bush import entity
+
+
+def chunk_keys(rect, size):
+    """yield the keys of the size by size chunks rect touches"""
+    for x in range(rect.left // size, (rect.right - 1) // size + 1):
+        for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            yield x, y
+
+
+class TileLayer(entity.Entity):
+    """
+    A map layer of static tiles.
+    Instead of one map sized surface the tiles are rendered into chunk surfaces the first time they are seen,
+    and chunks that haven't been seen in a while are thrown away once there are more than max_chunks of them.
+    On screen the layer is drawn from a camera sized surface that is scrolled as the camera moves,
+    so only the newly exposed strips need redrawing.
+
+    CameraGroup draws it through camera_blits.  Other groups get the whole layer as image,
+    which is only rendered the first time it is asked for.
+
+    sources can map chunk keys to functions that return already rendered chunks, used instead of the tiles.
+    """
+
+    def __init__(
+        self,
+        size,
+        layer=1,
+        chunk_size=256,
+        max_chunks=64,
+        colorkey=(255, 255, 0),
+        id=None,
+    ):
+        super().__init__((0, 0), layer=layer, topleft=True, id=id)
+        self.rect = pygame.Rect((0, 0), size)
+        # Entity.update recenters the rect on pos
+        self.pos = pygame.Vector2(self.rect.center)
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.colorkey = colorkey
+        self.tiles = {}
+        self.sources = {}
+        self.chunks = OrderedDict()
+        self.view = None
+        self.view_rect = None
+        self.full_image = None
+
+    @property
+    def image(self):
+        if self.full_image is None:
+            self.full_image = pygame.Surface(self.rect.size).convert()
+            self.full_image.fill(self.colorkey)
+            self.full_image.set_colorkey(self.colorkey)
+            self.render(self.full_image, self.rect)
+        return self.full_image
+
+    @image.setter
+    def image(self, value):
+        self.full_image = value
+
+    def chunk_keys(self, rect):
+        return chunk_keys(rect.clip(self.rect), self.chunk_size)
+
+    def chunk_rect(self, key):
+        size = self.chunk_size
+        return pygame.Rect(key[0] * size, key[1] * size, size, size).clip(self.rect)
+
+    def add_tile(self, image, pos):
+        rect = image.get_rect(topleft=pos)
+        for key in self.chunk_keys(rect):
+            chunk_rect = self.chunk_rect(key)
+            local_pos = rect.left - chunk_rect.left, rect.top - chunk_rect.top
+            self.tiles.setdefault(key, []).append((image, local_pos))
+            self.chunks.pop(key, None)
+        self.view_rect = None
+        self.full_image = None
+
+    def get_chunk(self, key):
+        chunk = self.chunks.get(key, None)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        if key in self.sources:
+            chunk = self.sources[key]()
+        else:
+            chunk = pygame.Surface(self.chunk_rect(key).size).convert()
+            chunk.fill(self.colorkey)
+            chunk.set_colorkey(self.colorkey)
+            chunk.fblits(self.tiles[key])
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return chunk
+
+    def render(self, surface, rect, dest=(0, 0)):
+        """draw the part of the layer under rect (in map coordinates) onto surface at dest"""
+        blits = []
+        for key in self.chunk_keys(rect):
+            if key in self.tiles or key in self.sources:
+                chunk_rect = self.chunk_rect(key)
+                pos = (
+                    chunk_rect.left - rect.left + dest[0],
+                    chunk_rect.top - rect.top + dest[1],
+                )
+                blits.append((self.get_chunk(key), pos))
+        surface.fblits(blits)
+
+    def redraw_view(self, rect):
+        """redraw the part of the view cache covering rect (in map coordinates)"""
+        rect = rect.clip(self.view_rect)
+        if not rect.width or not rect.height:
+            return
+        dest = rect.left - self.view_rect.left, rect.top - self.view_rect.top
+        self.view.set_clip(pygame.Rect(dest, rect.size))
+        self.view.fill(self.colorkey)
+        self.render(self.view, rect, dest)
+        self.view.set_clip(None)
+
+    def camera_blits(self, cam_rect):
+        if self.view is None or self.view.get_size() != cam_rect.size:
+            self.view = pygame.Surface(cam_rect.size).convert()
+            self.view.set_colorkey(self.colorkey)
+            self.view_rect = None
+        old_rect = self.view_rect
+        self.view_rect = cam_rect.copy()
+        if old_rect is None or not old_rect.colliderect(cam_rect):
+            self.redraw_view(cam_rect)
+        elif old_rect != cam_rect:
+            dx, dy = cam_rect.left - old_rect.left, cam_rect.top - old_rect.top
+            self.view.scroll(-dx, -dy)
+            # strips uncovered by the scroll
+            if dx:
+                strip = cam_rect.copy()
+                strip.width = abs(dx)
+                if dx > 0:
+                    strip.right = cam_rect.right
+                self.redraw_view(strip)
+            if dy:
+                strip = cam_rect.copy()
+                strip.height = abs(dy)
+                if dy > 0:
+                    strip.bottom = cam_rect.bottom
+                self.redraw_view(strip)
+        return [(self.view, (0, 0))]
+
+    def memory_size(self):
+        """approximate bytes held by rendered surfaces"""
+        surfaces = list(self.chunks.values())
+        for surface in (self.view, self.full_image):
+            if surface is not None:
+                surfaces.append(surface)
+        return sum(
+            surface.get_width() * surface.get_height() * surface.get_bytesize()
+            for surface in surfaces
+        )
+
+
+class AnimatedTileLayer(entity.Entity):
+    """
+    All the animated tiles of a map layer as one sprite.
+    Tiles with the same gid share one Animation, so each gid's frame is worked out once per draw
+    and every copy of it is drawn in the same batch.
+
+    CameraGroup draws it through camera_blits.  Other groups get the whole layer as image,
+    which is re-rendered whenever a frame changes.
+    """
+
+    def __init__(self, size, layer=1, chunk_size=256, colorkey=(255, 255, 0), id=None):
+        self.chunk_size = chunk_size
+        self.colorkey = colorkey
+        self.anims = {}
+        self.chunks = {}
+        self.full_frames = None
+        super().__init__((0, 0), layer=layer, topleft=True, id=id)
+        self.rect = pygame.Rect((0, 0), size)
+        self.pos = pygame.Vector2(self.rect.center)
+        self.full_image = None
+
+    def chunk_keys(self, rect):
+        return chunk_keys(rect.clip(self.rect), self.chunk_size)
+
+    def add_tile(self, gid, anim, pos):
+        """add a copy of gid at pos.  The first animation given for a gid is the one all its copies play"""
+        anim = self.anims.setdefault(gid, anim)
+        rect = anim.image().get_rect(topleft=pos)
+        # tiles are filed under the chunk of their topleft, so look one chunk further up and left when drawing
+        key = rect.left // self.chunk_size, rect.top // self.chunk_size
+        self.chunks.setdefault(key, []).append((gid, rect.topleft))
+        self.full_image = None
+
+    def frames(self):
+        """the current frame of every gid"""
+        return {gid: anim.image() for gid, anim in self.anims.items()}
+
+    def camera_blits(self, cam_rect):
+        frames = self.frames()
+        offset_x, offset_y = cam_rect.topleft
+        search_rect = cam_rect.inflate(self.chunk_size, self.chunk_size).move(
+            -self.chunk_size // 2, -self.chunk_size // 2
+        )
+        blits = []
+        for key in self.chunk_keys(search_rect):
+            for gid, (x, y) in self.chunks.get(key, ()):
+                image = frames[gid]
+                if cam_rect.colliderect((x, y), image.get_size()):
+                    blits.append((image, (x - offset_x, y - offset_y)))
+        return blits
+
+    @property
+    def image(self):
+        frames = self.frames()
+        if self.full_image is None:
+            self.full_image = pygame.Surface(self.rect.size).convert()
+            self.full_image.set_colorkey(self.colorkey)
+            self.full_frames = None
+        if frames != self.full_frames:
+            self.full_frames = frames
+            self.full_image.fill(self.colorkey)
+            self.full_image.fblits(
+                [
+                    (frames[gid], pos)
+                    for tiles in self.chunks.values()
+                    for gid, pos in tiles
+                ]
+            )
+        return self.full_image
+
+    @image.setter
+    def image(self, value):
+        self.full_image = value
+        self.full_frames = None
+
+    def memory_size(self):
+        """approximate bytes held by frames and the full image"""
+        surfaces = {
+            id(image): image for anim in self.anims.values() for image in anim.images
+        }
+        if self.full_image is not None:
+            surfaces[id(self.full_image)] = self.full_image
+        return sum(
+            surface.get_width() * surface.get_height() * surface.get_bytesize()
+            for surface in surfaces.values()
+        )
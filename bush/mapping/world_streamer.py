@@ -0,0 +1,228 @@
+"""
+world streamer
+ - loads the maps of a Tiled .world file around the player in the background
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from xml.etree import ElementTree
+
+import pygame
+
+import pytmx
+from pytmx import util_pygame
+
+WorldMap = namedtuple("WorldMap", ["path", "rect"])
+
+
+def map_size(path):
+    """pixel size of a tmx map, read from its header without parsing the rest"""
+    for _, element in ElementTree.iterparse(path, events=("start",)):
+        return (
+            int(element.get("width")) * int(element.get("tilewidth")),
+            int(element.get("height")) * int(element.get("tileheight")),
+        )
+
+
+def read_world(path):
+    """return the WorldMaps of a .world file without loading any of them"""
+    with open(path) as file:
+        world_data = json.loads(file.read())
+    world_maps = []
+    for map_data in world_data["maps"]:
+        map_path = os.path.join(os.path.dirname(path), map_data["fileName"])
+        if "width" in map_data and "height" in map_data:
+            size = map_data["width"], map_data["height"]
+        else:
+            size = map_size(map_path)
+        world_maps.append(
+            WorldMap(map_path, pygame.Rect((map_data["x"], map_data["y"]), size))
+        )
+    return world_maps
+
+
+def parse_map(path):
+    """
+    parse a tmx file, loading its images without converting them so that it can run off the main thread.
+    Returns the map and a list of (image index, colorkey, pixelalpha) conversions still to do.
+    """
+    conversions = {}
+
+    def image_loader(filename, colorkey, **kwargs):
+        if colorkey:
+            colorkey = pygame.Color("#{0}".format(colorkey))
+        pixelalpha = kwargs.get("pixelalpha", True)
+        image = pygame.image.load(filename)
+
+        def load_image(rect=None, flags=None):
+            if rect:
+                tile = image.subsurface(rect)
+            else:
+                tile = image.copy()
+            if flags:
+                tile = util_pygame.handle_transformation(tile, flags)
+            conversions[id(tile)] = colorkey, pixelalpha
+            return tile
+
+        return load_image
+
+    tmx_map = pytmx.TiledMap(path, image_loader=image_loader)
+    steps = [
+        (index, *conversions[id(image)])
+        for index, image in enumerate(tmx_map.images)
+        if image is not None
+    ]
+    return tmx_map, steps
+
+
+class WorldStreamer:
+    """
+    Keeps the maps of a world around a point loaded.
+    Maps within prefetch_distance of the point are parsed on a worker thread,
+    then have their images converted and are built with map_loader on the main thread,
+    a little at a time so that no call to update takes much longer than time_budget seconds.
+    Maps further than keep_distance away are dropped.
+    """
+
+    def __init__(
+        self,
+        map_loader,
+        world_path,
+        prefetch_distance=128,
+        keep_distance=None,
+        time_budget=0.002,
+    ):
+        self.map_loader = map_loader
+        self.world_maps = read_world(world_path)
+        self.prefetch_distance = prefetch_distance
+        self.keep_distance = keep_distance
+        if keep_distance is None:
+            self.keep_distance = prefetch_distance * 2
+        self.time_budget = time_budget
+        self.requests = queue.Queue()
+        self.parsed = queue.Queue()
+        self.requested = set()
+        self.converting = OrderedDict()
+        self.ready = {}
+        self.keep = None
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def work(self):
+        while True:
+            path = self.requests.get()
+            if path is None:
+                return
+            try:
+                result = parse_map(path)
+            except Exception as error:
+                result = error
+            self.parsed.put((path, result))
+
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
+
+    def map_at(self, pos):
+        for world_map in self.world_maps:
+            if world_map.rect.collidepoint(pos):
+                return world_map
+
+    def nearby(self, pos, distance):
+        return [
+            world_map
+            for world_map in self.world_maps
+            if world_map.rect.inflate(distance * 2, distance * 2).collidepoint(pos)
+        ]
+
+    def request(self, path):
+        if path in self.ready or path in self.converting or path in self.requested:
+            return
+        # checked first so that polling doesn't count a cache miss every frame
+        if path in self.map_loader.cache:
+            self.ready[path] = self.map_loader.cache.get(path)
+            return
+        self.requested.add(path)
+        self.requests.put(path)
+
+    def drop(self, path):
+        self.ready.pop(path, None)
+        self.converting.pop(path, None)
+        self.map_loader.cache.remove(path)
+
+    def receive(self, path, result):
+        self.requested.discard(path)
+        if isinstance(result, Exception):
+            raise result
+        if self.keep is None or path in self.keep:
+            tmx_map, conversions = result
+            self.converting[path] = self.finish(path, tmx_map, conversions)
+
+    def collect(self):
+        while True:
+            try:
+                path, result = self.parsed.get_nowait()
+            except queue.Empty:
+                return
+            self.receive(path, result)
+
+    def finish(self, path, tmx_map, conversions):
+        """main thread work for a parsed map, yielding between small steps"""
+        for index, colorkey, pixelalpha in conversions:
+            tmx_map.images[index] = util_pygame.smart_convert(
+                tmx_map.images[index], colorkey, pixelalpha
+            )
+            yield
+        for result in self.map_loader.load_steps(tmx_map):
+            yield
+        del self.converting[path]
+        self.ready[path] = result[:2]
+
+    def convert(self, path, end_time=None):
+        """work on a map until it is ready or end_time passes.  Returns whether it is ready"""
+        steps = self.converting[path]
+        for _ in steps:
+            if end_time is not None and time.perf_counter() > end_time:
+                return False
+        return True
+
+    def step(self, time_budget=None):
+        if time_budget is None:
+            time_budget = self.time_budget
+        end_time = time.perf_counter() + time_budget
+        self.collect()
+        while self.converting and time.perf_counter() < end_time:
+            if not self.convert(next(iter(self.converting)), end_time):
+                return
+
+    def update(self, pos):
+        """prefetch maps near pos, drop far away ones and spend up to time_budget finishing loaded maps"""
+        self.keep = {
+            world_map.path for world_map in self.nearby(pos, self.keep_distance)
+        }
+        for path in list(self.ready) + list(self.converting):
+            if path not in self.keep:
+                self.drop(path)
+        for world_map in self.nearby(pos, self.prefetch_distance):
+            self.request(world_map.path)
+        self.step()
+
+    def load(self, path):
+        """return (registry, properties) for a map of the world, waiting for it if it isn't ready"""
+        if self.keep is not None:
+            self.keep.add(path)
+        self.request(path)
+        while path not in self.ready:
+            if path in self.converting:
+                self.convert(path)
+            else:
+                self.receive(*self.parsed.get())
+        return self.ready[path]
+
+    def load_at(self, pos):
+        world_map = self.map_at(pos)
+        if world_map is not None:
+            return self.load(world_map.path)
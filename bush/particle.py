@@ -146,6 +146,18 @@ class ParticleManager:
             [(particle.image, particle.pos + offset) for particle in self.particles]
         )
 
+    def positions(self):
+        """where each particle is, using the centre (true_pos) of particles that draw from a corner"""
+        return [
+            getattr(particle, "true_pos", particle.pos) for particle in self.particles
+        ]
+
+    def remove_hits(self, hits):
+        """remove the particles flagged in hits, eg. from collision.collide_points_mask(manager.positions(), ...)"""
+        self.particles = [
+            particle for particle, hit in zip(self.particles, hits) if not hit
+        ]
+
     def __len__(self):
         return len(self.particles)
 
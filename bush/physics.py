@@ -1,20 +1,313 @@
 """
 physics - simple top down physics + shape primitives
 """
+import math
 from collections import namedtuple
 
 import pygame
 
-from bush import collision, util
+from bush import broadphase, collision, util
 
 TYPE_STATIC = 0
 TYPE_DYNAMIC = 1
 TYPE_TRIGGER = 2
 
-PhysicsData = namedtuple("PhysicsData", ("type", "collision_group"))
+# bodies slower than SLEEP_VELOCITY for SLEEP_STEPS updates in a row stop being simulated
+SLEEP_VELOCITY = 1
+SLEEP_STEPS = 30
 
+PhysicsData = namedtuple(
+    "PhysicsData",
+    ("type", "collision_group", "continuous", "mass", "immovable"),
+    defaults=(False, 1, False),
+)
 
-def optimize_for_physics(group):
+
+class TileGrid:
+    """
+    Static geometry made of whole tiles, stored as one byte per tile.
+    Rect tests and separation are done with tile math instead of pixel masks.
+    Tiles that aren't completely solid keep a mask of their own, which is only looked at
+    when something actually touches that tile.
+    """
+
+    EMPTY = 0
+    SOLID = 1
+    SHAPED = 2
+
+    def __init__(self, size, tile_size):
+        self.width, self.height = size
+        self.tile_size = tuple(tile_size)
+        self.flags = bytearray(self.width * self.height)
+        self.shapes = {}
+        self.full_mask = None
+
+    def get_size(self):
+        return self.width * self.tile_size[0], self.height * self.tile_size[1]
+
+    def set_tile(self, x, y, mask=None):
+        """make a tile solid, or shaped like mask if it isn't completely filled"""
+        self.full_mask = None
+        self.shapes.pop((x, y), None)
+        if mask is None or mask.count() == self.tile_size[0] * self.tile_size[1]:
+            self.flags[y * self.width + x] = self.SOLID
+        else:
+            self.flags[y * self.width + x] = self.SHAPED
+            self.shapes[x, y] = mask
+
+    def clear_tile(self, x, y):
+        self.full_mask = None
+        self.shapes.pop((x, y), None)
+        self.flags[y * self.width + x] = self.EMPTY
+
+    def fill_rects(self, rects):
+        """make every tile under the rects (in grid pixels) solid"""
+        for rect in rects:
+            left, top, right, bottom = self.cell_range(rect, (0, 0))
+            for y in range(top, bottom + 1):
+                for x in range(left, right + 1):
+                    self.set_tile(x, y)
+
+    def cell_range(self, rect, pos):
+        tile_width, tile_height = self.tile_size
+        return (
+            max((rect.left - pos[0]) // tile_width, 0),
+            max((rect.top - pos[1]) // tile_height, 0),
+            min((rect.right - 1 - pos[0]) // tile_width, self.width - 1),
+            min((rect.bottom - 1 - pos[1]) // tile_height, self.height - 1),
+        )
+
+    def tile_pos(self, x, y, pos):
+        return pos[0] + x * self.tile_size[0], pos[1] + y * self.tile_size[1]
+
+    def touching(self, rect, pos):
+        """yield (x, y, flag) of the filled tiles a rect covers, with the grid drawn at pos"""
+        left, top, right, bottom = self.cell_range(rect, pos)
+        if left > right:
+            return
+        flags = self.flags
+        for y in range(top, bottom + 1):
+            row = flags[y * self.width + left : y * self.width + right + 1]
+            if self.SOLID not in row and self.SHAPED not in row:
+                continue
+            for x, flag in enumerate(row, left):
+                if flag:
+                    yield x, y, flag
+
+    def collide_rect(self, rect, pos=(0, 0)):
+        left, top, right, bottom = self.cell_range(rect, pos)
+        if left > right:
+            return False
+        flags = self.flags
+        for y in range(top, bottom + 1):
+            row = flags[y * self.width + left : y * self.width + right + 1]
+            if self.SOLID in row:
+                return True
+            if self.SHAPED not in row:
+                continue
+            for x, flag in enumerate(row, left):
+                if flag == self.SHAPED and collision.collide_rect_mask(
+                    rect, self.shapes[x, y], self.tile_pos(x, y, pos)
+                ):
+                    return True
+        return False
+
+    def separate_rect(self, rect, pos, axis, direction):
+        """same as collision.separate_rect_mask, for the grid drawn at pos"""
+        moved = rect.copy()
+        while True:
+            target = self.clearing_edge(moved, pos, axis, direction)
+            if target is None:
+                return moved[axis] - rect[axis]
+            moved[axis] = target
+
+    def shaped_edge(self, rect, pos, x, y, axis, direction):
+        """where rect has to move along axis to clear a shaped tile, or None if it doesn't touch it"""
+        tile_pos = self.tile_pos(x, y, pos)
+        if not collision.collide_rect_mask(rect, self.shapes[x, y], tile_pos):
+            return None
+        return rect[axis] + collision.separate_rect_mask(
+            rect, self.shapes[x, y], tile_pos, axis, direction
+        )
+
+    def run_end(self, x, y, axis, direction, left, right):
+        """
+        the first tile coordinate along axis past the run of solid tiles that starts at (x, y),
+        across columns left to right when going along rows
+        """
+        flags = self.flags
+        width = self.width
+        if axis:
+            while (
+                0 <= y + direction < self.height
+                and self.SOLID
+                in flags[
+                    (y + direction) * width + left : (y + direction) * width + right + 1
+                ]
+            ):
+                y += direction
+            return y + direction
+        if direction > 0:
+            rest = flags[y * width + x : (y + 1) * width]
+            ends = [
+                end
+                for end in (rest.find(self.EMPTY), rest.find(self.SHAPED))
+                if end != -1
+            ]
+            return x + min(ends, default=len(rest))
+        rest = flags[y * width : y * width + x + 1]
+        return max(rest.rfind(self.EMPTY), rest.rfind(self.SHAPED))
+
+    def clearing_edge(self, rect, pos, axis, direction):
+        """
+        where rect has to move along axis to clear the tiles it covers now, or None if it covers none.
+        Rows are scanned as flag slices, and the rect is pushed past the whole run of solid tiles
+        in its way at once, so only shaped tiles are looked at one by one.
+        """
+        left, top, right, bottom = self.cell_range(rect, pos)
+        if left > right:
+            return None
+        flags = self.flags
+        target = None
+        rows = range(top, bottom + 1)
+        if axis and direction > 0:
+            rows = reversed(rows)
+        for y in rows:
+            row = flags[y * self.width + left : y * self.width + right + 1]
+            edges = []
+            solid = -1
+            if axis:
+                # a tile in a farther row always pushes further than one in a nearer row
+                if self.SOLID in row:
+                    edges.append(self.run_end(0, y, axis, direction, left, right))
+                shaped = range(len(row)) if not edges else ()
+            elif direction > 0:
+                solid = row.rfind(self.SOLID)
+                shaped = range(solid + 1, len(row))
+            else:
+                solid = row.find(self.SOLID)
+                shaped = range(solid if solid != -1 else len(row))
+            if solid != -1:
+                edges.append(
+                    self.run_end(left + solid, y, axis, direction, left, right)
+                )
+            size = self.tile_size[axis]
+            edges = [
+                pos[axis] + end * size
+                if direction > 0
+                else pos[axis] + (end + 1) * size - rect.size[axis]
+                for end in edges
+            ]
+            if shaped and self.SHAPED in row:
+                for index in shaped:
+                    if row[index] == self.SHAPED:
+                        edge = self.shaped_edge(
+                            rect, pos, left + index, y, axis, direction
+                        )
+                        if edge is not None:
+                            edges.append(edge)
+            for edge in edges:
+                if target is None or (edge - target) * direction > 0:
+                    target = edge
+            if axis and target is not None:
+                return target
+        return target
+
+    def sweep_rect(self, rect, pos, axis, distance):
+        """same as collision.sweep_rect_mask, for the grid drawn at pos"""
+        reach = math.ceil(abs(distance))
+        if not reach:
+            return distance
+        strip = rect.copy()
+        if distance > 0:
+            strip[axis] += rect.size[axis]
+        else:
+            strip[axis] -= reach
+        if axis:
+            strip.height = reach
+        else:
+            strip.width = reach
+        allowed = distance
+        for x, y, flag in self.touching(strip, pos):
+            tile_pos = self.tile_pos(x, y, pos)
+            if flag == self.SOLID:
+                if distance > 0:
+                    hit = tile_pos[axis] - (rect[axis] + rect.size[axis])
+                else:
+                    hit = tile_pos[axis] + self.tile_size[axis] - rect[axis]
+            else:
+                hit = collision.sweep_rect_mask(
+                    rect, self.shapes[x, y], tile_pos, axis, distance
+                )
+            if abs(hit) < abs(allowed):
+                allowed = hit
+        return allowed
+
+    def to_mask(self):
+        """the whole grid as a pixel mask, for things that need one (like raycast)"""
+        if self.full_mask is None:
+            solid = [
+                [
+                    flag == self.SOLID
+                    for flag in self.flags[y * self.width : (y + 1) * self.width]
+                ]
+                for y in range(self.height)
+            ]
+            self.full_mask = collision.rects_mask(
+                collision.grid_rects(solid, self.tile_size), self.get_size()
+            )
+            for (x, y), shape in self.shapes.items():
+                self.full_mask.draw(shape, self.tile_pos(x, y, (0, 0)))
+        return self.full_mask
+
+
+def add_tile_grid(group, tile_grid, pos=(0, 0)):
+    """add a static body for a TileGrid drawn at pos to a collision group"""
+    sprite = pygame.sprite.Sprite()
+    sprite.rect = pygame.Rect(pos, tile_grid.get_size())
+    sprite.pos = sprite.rect.center
+    sprite.tile_grid = tile_grid
+    sprite.physics_data = PhysicsData(TYPE_STATIC, group)
+    group.add(sprite)
+    return sprite
+
+
+class MergedStatic(pygame.sprite.Sprite):
+    """
+    The static bodies of a group merged into one by optimize_for_physics.
+    Physics uses chunked_mask.  mask is the same bits as one pygame.Mask,
+    for everything else that wants a sprite mask, and is only built the first time it is asked for.
+    """
+
+    def __init__(self, rect, chunked_mask, group):
+        super().__init__()
+        self.rect = rect
+        self.pos = rect.center
+        self.chunked_mask = chunked_mask
+        self.full_mask = None
+        self.physics_data = PhysicsData(TYPE_STATIC, group)
+
+    @property
+    def mask(self):
+        if self.full_mask is None:
+            self.full_mask = self.chunked_mask.to_mask()
+        return self.full_mask
+
+
+def static_mask(sprite):
+    """the mask to collide a static body with, preferring a merged body's ChunkedMask"""
+    chunked_mask = sprite.__dict__.get("chunked_mask", None)
+    if chunked_mask is None:
+        return sprite.mask
+    return chunked_mask
+
+
+def optimize_for_physics(group, chunk_size=256, tile_size=None):
+    """
+    merge the static bodies in a group into one.
+    With tile_size, bodies that line up with a grid of that size go into a TileGrid
+    and only the rest are drawn into a mask.
+    """
     groups = (
         pygame.sprite.Group(),
         pygame.sprite.Group(),
@@ -28,69 +321,421 @@ def optimize_for_physics(group):
         except AttributeError:
             rects[type] = sprite.rect.copy()
         groups[type].add(sprite)
+    if tile_size is not None and rects[TYPE_STATIC] is not None:
+        rect = rects[TYPE_STATIC]
+        tile_width, tile_height = tile_size
+        origin = (
+            rect.left // tile_width * tile_width,
+            rect.top // tile_height * tile_height,
+        )
+        tile_grid = TileGrid(
+            (
+                -(-(rect.right - origin[0]) // tile_width),
+                -(-(rect.bottom - origin[1]) // tile_height),
+            ),
+            tile_size,
+        )
+        rects[TYPE_STATIC] = None
+        for sprite in groups[TYPE_STATIC].sprites():
+            local = sprite.rect.move(-origin[0], -origin[1])
+            aligned = not (
+                local.left % tile_width
+                or local.top % tile_height
+                or local.width % tile_width
+                or local.height % tile_height
+            )
+            mask = getattr(sprite, "mask", None)
+            filled = mask is None or mask.count() == local.width * local.height
+            if aligned and local.width and local.height and filled:
+                tile_grid.fill_rects((local,))
+            elif aligned and local.size == tuple(tile_size):
+                tile_grid.set_tile(
+                    local.left // tile_width, local.top // tile_height, mask
+                )
+            else:
+                # left for the mask
+                if rects[TYPE_STATIC] is None:
+                    rects[TYPE_STATIC] = sprite.rect.copy()
+                else:
+                    rects[TYPE_STATIC].union_ip(sprite.rect)
+                continue
+            group.remove(sprite)
+            groups[TYPE_STATIC].remove(sprite)
+        add_tile_grid(group, tile_grid, origin)
     for key in (TYPE_STATIC,):
         if rects[key] is None:
             continue
-        megamask = pygame.Mask(rects[key].size)
+        rect = rects[key]
+        megamask = collision.ChunkedMask(rect.size, chunk_size)
         for sprite in groups[key]:
-            megamask.draw(sprite.mask, sprite.rect.topleft)
+            megamask.draw(
+                sprite.mask, (sprite.rect.left - rect.left, sprite.rect.top - rect.top)
+            )
             group.remove(sprite)
-        new_sprite = pygame.sprite.Sprite()
-        new_sprite.rect = megamask.get_rect()
-        new_sprite.pos = new_sprite.rect.center
-        new_sprite.mask = megamask
-        new_sprite.physics_data = PhysicsData(key, group)
-        group.add(new_sprite)
+        megamask.prune()
+        group.add(MergedStatic(rect, megamask, group))
+
+
+def raycast(group, start, end):
+    """return (hit point, distance) of the first static geometry in group between start and end, or None"""
+    bounds = pygame.Rect(start, (0, 0)).union(pygame.Rect(end, (0, 0))).inflate(2, 2)
+    nearest = None
+    for sprite in get_candidates(None, group, bounds):
+        if sprite.physics_data.type != TYPE_STATIC:
+            continue
+        index = sprite.__dict__.get("mask_index", None)
+        if index is None:
+            tile_grid = sprite.__dict__.get("tile_grid", None)
+            if tile_grid is None:
+                mask = static_mask(sprite)
+            else:
+                mask = tile_grid.to_mask()
+            index = sprite.mask_index = collision.MaskIndex(mask)
+        hit = index.raycast(start, end, sprite.rect.topleft)
+        if hit is not None and (nearest is None or hit[1] < nearest[1]):
+            nearest = hit
+    return nearest
+
+
+def line_of_sight(group, start, end):
+    return raycast(group, start, end) is None
+
+
+def get_candidates(sprite, group, rect=None):
+    """return the sprites in group that could be colliding with sprite (or rect, if given)"""
+    if isinstance(group, broadphase.BroadphaseGroup):
+        if rect is None:
+            rect = broadphase.body_rect(sprite)
+        return group.query(rect)
+    return group.sprites()
+
+
+def sweep(self, axis, distance, stop_on_collision=False):
+    """return how far a body can move along axis before hitting static geometry"""
+    rect = self.collision_rect
+    swept = rect.copy()
+    if axis:
+        swept.height += math.ceil(abs(distance))
+        swept.top = min(rect.top, rect.top + math.floor(distance))
+    else:
+        swept.width += math.ceil(abs(distance))
+        swept.left = min(rect.left, rect.left + math.floor(distance))
+    for sprite in get_candidates(self, self.physics_data.collision_group, swept):
+        if sprite.physics_data.type != TYPE_STATIC:
+            continue
+        tile_grid = sprite.__dict__.get("tile_grid", None)
+        if tile_grid is not None:
+            if tile_grid.collide_rect(rect, sprite.rect.topleft):
+                continue
+            allowed = tile_grid.sweep_rect(rect, sprite.rect.topleft, axis, distance)
+        else:
+            mask = static_mask(sprite)
+            if collision.collide_rect_mask(rect, mask, sprite.rect.topleft):
+                continue  # already inside, leave it to static_collision
+            allowed = collision.sweep_rect_mask(
+                rect, mask, sprite.rect.topleft, axis, distance
+            )
+        if abs(allowed) < abs(distance):
+            distance = allowed
+            if stop_on_collision:
+                self.velocity[axis] = 0
+    return distance
+
+
+def update_sleep(self):
+    """track how long a body has been still, returning whether it needs simulating"""
+    if self.velocity.length_squared() >= SLEEP_VELOCITY * SLEEP_VELOCITY:
+        if self.__dict__.get("_still_steps", 0):
+            wake(self)
+        return True
+    if self.__dict__.get("sleeping", False):
+        return False
+    self._still_steps = self.__dict__.get("_still_steps", 0) + 1
+    if self._still_steps >= SLEEP_STEPS:
+        self.sleeping = True
+    return True
+
+
+def wake(self):
+    self.sleeping = False
+    self._still_steps = 0
+
+
+def is_sleeping(self):
+    return self.__dict__.get("sleeping", False)
+
+
+def sleep_counts(bodies):
+    """return how many of the bodies are (awake, sleeping)"""
+    sleeping = sum(1 for body in bodies if is_sleeping(body))
+    return len(bodies) - sleeping, sleeping
 
 
 def dynamic_update(self, dt, stop_on_collision=False):
+    if not update_sleep(self):
+        # triggers still see sleeping bodies, and wake them when a new one touches
+        if update_triggers(self):
+            wake(self)
+        return
+    callbacks = (
+        static_collision,
+        dynamic_collision,
+        trigger_collision,
+    )
     for axis in range(2):
-        self.pos[axis] += self.velocity[axis] * dt
+        distance = self.velocity[axis] * dt
+        if self.physics_data.continuous and distance:
+            distance = sweep(self, axis, distance, stop_on_collision)
+        self.pos[axis] += distance
         self.update_rects()
-        callbacks = (
-            static_collision,
-            dynamic_collision,
-            trigger_collision,
-        )
-        for sprite in self.physics_data.collision_group:
+        for sprite in get_candidates(self, self.physics_data.collision_group):
+            if sprite is self:
+                continue
             callbacks[sprite.physics_data.type](self, sprite, axis, stop_on_collision)
+    moved(self)
+    update_triggers(self)
+
+
+def moved(self):
+    """keep the body's collision group in sync after moving it outside of dynamic_update"""
+    group = self.physics_data.collision_group
+    if isinstance(group, broadphase.BroadphaseGroup):
+        group.move(self)
 
 
 def static_collision(dynamic, static, axis, stop_on_collision):
-    velocity = pygame.Vector2()
-    velocity[axis] = -dynamic.velocity[axis]
-    velocities = [velocity]
+    velocity = dynamic.velocity[axis]
+    directions = (-1 if velocity > 0 else 1,)
     if not velocity:
-        velocity[axis] = 1
-        velocities = [velocity, -velocity]
-    motions = {}
-    start_pos = tuple(dynamic.pos)
-    for velocity in velocities:
-        if velocity.length_squared() < 0.0001:
-            continue
-        velocity.scale_to_length(0.2)
-        motion = pygame.Vector2()
-        while collision.collide_rect_mask(
-            dynamic.collision_rect, static.mask, static.rect.topleft
-        ):
-            dynamic.pos += velocity
-            motion += velocity
-            dynamic.update_rects()
-        motions[motion.length_squared()] = motion
-        dynamic.pos.update(start_pos)
-        dynamic.update_rects()
-    if motions:
-        dynamic.pos += motions[min(motions.keys())]
+        directions = (1, -1)
+    elif abs(velocity) < 0.01:
+        return
+    rect = dynamic.collision_rect
+    tile_grid = static.__dict__.get("tile_grid", None)
+    if tile_grid is not None:
+        if not tile_grid.collide_rect(rect, static.rect.topleft):
+            return
+    else:
+        mask = static_mask(static)
+        if not collision.collide_rect_mask(rect, mask, static.rect.topleft):
+            return
+    motion = None
+    for direction in directions:
+        if tile_grid is not None:
+            distance = tile_grid.separate_rect(
+                rect, static.rect.topleft, axis, direction
+            )
+        else:
+            distance = collision.separate_rect_mask(
+                rect, mask, static.rect.topleft, axis, direction
+            )
+        if motion is None or abs(distance) < abs(motion):
+            motion = distance
+        elif abs(distance) == abs(motion):
+            # ties go the way pos already leans within its pixel, as the old 0.2px stepping did
+            if dynamic.pos[axis] % 1 > 0.5:
+                motion = max(motion, distance)
+            else:
+                motion = min(motion, distance)
+    dynamic.pos[axis] += motion
+    dynamic.update_rects()
 
 
 def dynamic_collision(dynamic1, dynamic2, axis, stop_on_collision):
-    # TODO
-    pass
+    # dynamic pairs are separated all at once in resolve_dynamic_collisions,
+    # this only wakes sleeping bodies that get bumped into
+    if is_sleeping(dynamic2) and broadphase.body_rect(dynamic1).colliderect(
+        broadphase.body_rect(dynamic2)
+    ):
+        wake(dynamic2)
+
+
+def inverse_mass(body):
+    data = body.physics_data
+    if data.immovable or not data.mass:
+        return 0
+    return 1 / data.mass
+
+
+def resolve_dynamic_collisions(bodies, use_masks=False, cell_size=64):
+    """
+    push apart every overlapping pair of dynamic bodies, splitting the correction by mass.
+    Corrections for all pairs are summed and applied once, so this should be run once per step.
+    Returns the colliding pairs.
+    """
+    spatial_hash = broadphase.SpatialHash(cell_size)
+    for body in bodies:
+        if body.physics_data.type == TYPE_DYNAMIC:
+            spatial_hash.add(body, broadphase.body_rect(body))
+    corrections = {}
+    pairs = []
+    for body1, body2 in spatial_hash.pairs():
+        if use_masks and not body1.mask.overlap(
+            body2.mask,
+            (body2.rect.left - body1.rect.left, body2.rect.top - body1.rect.top),
+        ):
+            continue
+        pairs.append((body1, body2))
+        if is_sleeping(body1) and is_sleeping(body2):
+            continue
+        inverse1 = inverse_mass(body1)
+        inverse2 = inverse_mass(body2)
+        if not inverse1 + inverse2:
+            continue
+        rect1 = spatial_hash.item_rects[body1]
+        rect2 = spatial_hash.item_rects[body2]
+        depths = (
+            min(rect1.right, rect2.right) - max(rect1.left, rect2.left),
+            min(rect1.bottom, rect2.bottom) - max(rect1.top, rect2.top),
+        )
+        axis = 1 if depths[1] < depths[0] else 0
+        depth = depths[axis]
+        if rect1.center[axis] > rect2.center[axis]:
+            depth = -depth
+        share = depth / (inverse1 + inverse2)
+        corrections.setdefault(body1, pygame.Vector2())[axis] -= share * inverse1
+        corrections.setdefault(body2, pygame.Vector2())[axis] += share * inverse2
+    for body, correction in corrections.items():
+        if is_sleeping(body):
+            wake(body)
+        body.pos += correction
+        body.update_rects()
+        moved(body)
+    return pairs
 
 
 def trigger_collision(dynamic, trigger, axis, stop_on_collision):
-    # TODO
-    if collision.collide_rect_mask(
-        dynamic.collision_rect.move(-trigger.rect.left, -trigger.rect.top), trigger.mask
-    ):
-        trigger.on_collision(dynamic)
+    # triggers are checked once per update in update_triggers
+    pass
+
+
+def has_rect_mask(sprite):
+    """whether a sprite's mask is completely filled (or missing), so a rect test is exact"""
+    result = sprite.__dict__.get("_rect_mask", None)
+    if result is None:
+        mask = getattr(sprite, "mask", None)
+        result = mask is None or mask.count() == sprite.rect.width * sprite.rect.height
+        sprite._rect_mask = result
+    return result
+
+
+def touching_trigger(dynamic, trigger):
+    rect = dynamic.collision_rect
+    if not rect.colliderect(trigger.rect):
+        return False
+    if has_rect_mask(trigger):
+        return True
+    return (
+        collision.collide_rect_mask(rect, trigger.mask, trigger.rect.topleft)
+        is not None
+    )
+
+
+def fire(sprite, callback_name, *args):
+    callback = getattr(sprite, callback_name, None)
+    if callback is not None:
+        callback(*args)
+
+
+def update_triggers(dynamic):
+    """
+    check which triggers a body is inside of, calling on_enter, on_stay and on_exit on the triggers.
+    Triggers with only the older on_collision callback get it once per update while touching.
+    Returns whether the body entered any trigger it wasn't touching before.
+    """
+    touching = {}
+    for sprite in get_candidates(dynamic, dynamic.physics_data.collision_group):
+        if sprite.physics_data.type == TYPE_TRIGGER and touching_trigger(
+            dynamic, sprite
+        ):
+            touching[sprite] = None
+    previous = dynamic.__dict__.get("triggers", {})
+    for trigger in previous:
+        if trigger not in touching:
+            trigger.__dict__.get("overlapping", {}).pop(dynamic, None)
+            fire(trigger, "on_exit", dynamic)
+    entered = False
+    for trigger in touching:
+        if trigger not in previous:
+            entered = True
+            trigger.__dict__.setdefault("overlapping", {})[dynamic] = None
+            fire(trigger, "on_enter", dynamic)
+        elif hasattr(trigger, "on_stay"):
+            trigger.on_stay(dynamic)
+        if not hasattr(trigger, "on_stay"):
+            fire(trigger, "on_collision", dynamic)
+    dynamic.triggers = touching
+    return entered
+
+
+class PhysicsWorld:
+    """
+    Steps a set of dynamic bodies at a fixed rate, independent of frame rate.
+    Bodies added here should not also call dynamic_update themselves.
+    """
+
+    def __init__(self, step=1 / 60, max_steps=5, stop_on_collision=False):
+        self.step = step
+        self.max_steps = max_steps
+        self.stop_on_collision = stop_on_collision
+        self.bodies = pygame.sprite.Group()
+        self.previous = {}
+        self.accumulator = 0
+        self.awake = 0
+        self.sleeping = 0
+
+    def add(self, *bodies):
+        self.bodies.add(*bodies)
+        for body in bodies:
+            self.previous[body] = pygame.Vector2(body.pos)
+
+    def remove(self, *bodies):
+        self.bodies.remove(*bodies)
+        for body in bodies:
+            self.previous.pop(body, None)
+
+    def teleport(self, body, pos):
+        """move a body without interpolating the jump"""
+        body.pos.update(pos)
+        body.update_rects()
+        moved(body)
+        wake(body)
+        self.previous[body] = pygame.Vector2(body.pos)
+
+    def update(self, dt):
+        """advance by dt seconds, returning how many steps were simulated"""
+        self.accumulator += dt
+        steps = 0
+        while self.accumulator >= self.step:
+            if steps == self.max_steps:
+                # too far behind, drop the backlog rather than spiral
+                self.accumulator %= self.step
+                break
+            self.accumulator -= self.step
+            self.step_once()
+            steps += 1
+        return steps
+
+    def step_once(self):
+        bodies = self.bodies.sprites()
+        for body in bodies:
+            self.previous[body] = pygame.Vector2(body.pos)
+            dynamic_update(body, self.step, self.stop_on_collision)
+        resolve_dynamic_collisions(bodies)
+        self.awake, self.sleeping = sleep_counts(bodies)
+
+    def alpha(self):
+        """how far between the last two steps we are, from 0 to 1"""
+        return self.accumulator / self.step
+
+    def render_pos(self, body):
+        previous = self.previous.get(body, None)
+        if previous is None:
+            return pygame.Vector2(body.pos)
+        return previous.lerp(body.pos, self.alpha())
+
+    def render_offset(self, body):
+        """return the whole pixel offset from where a body is to where it should be drawn"""
+        if body not in self.previous:
+            return 0, 0
+        return util.rvec(self.render_pos(body) - body.pos)
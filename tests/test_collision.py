@@ -0,0 +1,124 @@
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import collision, physics
+
+
+def walk_separate(rect, mask, mask_pos, axis, direction):
+    # the original separation: jump the rect past each overlap point, one query at a time
+    rect_mask = pygame.Mask(rect.size, True)
+    pos = [rect.left - mask_pos[0], rect.top - mask_pos[1]]
+    while True:
+        point = mask.overlap(rect_mask, pos)
+        if point is None:
+            return pos[axis] + mask_pos[axis] - rect[axis]
+        if direction > 0:
+            pos[axis] = point[axis] + 1
+        else:
+            pos[axis] = point[axis] - rect.size[axis]
+
+
+def step_separate(body, static, axis):
+    # the original static_collision: step 0.2px at a time both ways and keep the shorter move
+    start = body.pos[axis]
+    motions = []
+    for direction in (1, -1):
+        while collision.collide_rect_mask(
+            body.collision_rect, static.mask, static.rect.topleft
+        ):
+            body.pos[axis] += 0.2 * direction
+            body.update_rects()
+        motions.append(body.pos[axis] - start)
+        body.pos[axis] = start
+        body.update_rects()
+    body.pos[axis] += min(motions, key=abs)
+    body.update_rects()
+
+
+def random_mask(size):
+    mask = pygame.Mask((size, size))
+    for _ in range(random.randint(1, 30)):
+        piece = pygame.Mask((random.randint(1, 80), random.randint(1, 80)), True)
+        mask.draw(piece, (random.randint(-20, size), random.randint(-20, size)))
+    return mask
+
+
+def random_rect(size):
+    width, height = random.randint(1, 40), random.randint(1, 40)
+    if random.random() < 0.2:
+        width = 1
+    elif random.random() < 0.2:
+        height = 1
+    return pygame.Rect(
+        random.randint(-60, size + 60), random.randint(-60, size + 60), width, height
+    )
+
+
+class Body:
+    def __init__(self, pos):
+        self.pos = pygame.Vector2(pos)
+        self.velocity = pygame.Vector2()
+        self.rect = pygame.Rect(0, 0, 10, 10)
+        self.collision_rect = self.rect.copy()
+        self.update_rects()
+
+    def update_rects(self):
+        self.rect.center = self.pos
+        self.collision_rect.center = self.pos
+
+
+class Static:
+    def __init__(self, rect, mask):
+        self.rect = rect
+        self.mask = mask
+
+
+def test_separate_rect_mask_matches_overlap_walk():
+    random.seed(1)
+    for _ in range(100):
+        mask = random_mask(300)
+        chunked = collision.ChunkedMask((300, 300), 64)
+        chunked.draw(mask, (0, 0))
+        chunked.prune()
+        mask_pos = random.randint(-50, 50), random.randint(-50, 50)
+        for _ in range(10):
+            rect = random_rect(300)
+            for axis in (0, 1):
+                for direction in (1, -1):
+                    want = walk_separate(rect, mask, mask_pos, axis, direction)
+                    for target in (mask, chunked):
+                        assert (
+                            collision.separate_rect_mask(
+                                rect, target, mask_pos, axis, direction
+                            )
+                            == want
+                        ), (rect, mask_pos, axis, direction, type(target))
+
+
+def test_static_collision_matches_stepping():
+    random.seed(3)
+    total = same = 0
+    for _ in range(2000):
+        static = Static(pygame.Rect(100, 100, 40, 40), random_mask(40))
+        pos = random.uniform(90, 150), random.uniform(90, 150)
+        axis = random.randint(0, 1)
+        stepped, body = Body(pos), Body(pos)
+        if not collision.collide_rect_mask(
+            body.collision_rect, static.mask, static.rect.topleft
+        ):
+            continue
+        step_separate(stepped, static, axis)
+        physics.static_collision(body, static, axis, False)
+        assert not collision.collide_rect_mask(
+            body.collision_rect, static.mask, static.rect.topleft
+        )
+        # near ties can go either way, but the distance moved stays within a pixel
+        moved = abs(body.pos[axis] - pos[axis])
+        assert abs(moved - abs(stepped.pos[axis] - pos[axis])) <= 1, (pos, axis)
+        total += 1
+        same += body.collision_rect == stepped.collision_rect
+    assert same >= total * 0.99
@@ -0,0 +1,36 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import entity
+from bush.mapping import group
+
+pygame.init()
+pygame.display.set_mode((64, 64))
+
+
+def make_camera(**kwargs):
+    return group.CameraGroup((100, 100), (1000, 1000), (50, 50), **kwargs)
+
+
+def test_sprite_moved_into_view_outside_the_group_is_visible():
+    camera = make_camera()
+    sprite = entity.Entity((350, 350), pygame.Surface((10, 10)), groups=[camera])
+    camera.update(1 / 60)
+    assert camera.visible_sprites() == []
+    sprite.pos.update(50, 50)
+    sprite.rect.center = sprite.pos
+    assert camera.visible_sprites() == [sprite]
+
+
+def test_spatial_culling_sees_sprites_after_moved():
+    camera = make_camera(spatial_culling=True)
+    sprite = entity.Entity((350, 350), pygame.Surface((10, 10)), groups=[camera])
+    camera.update(1 / 60)
+    assert camera.visible_sprites() == []
+    sprite.pos.update(50, 50)
+    sprite.rect.center = sprite.pos
+    camera.moved(sprite)
+    assert camera.visible_sprites() == [sprite]
@@ -0,0 +1,87 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import broadphase, physics
+
+
+class Body(pygame.sprite.Sprite):
+    def __init__(self, pos, group, type=physics.TYPE_DYNAMIC, size=(10, 10)):
+        super().__init__()
+        self.pos = pygame.Vector2(pos)
+        self.velocity = pygame.Vector2()
+        self.rect = pygame.Rect((0, 0), size)
+        self.collision_rect = self.rect.copy()
+        self.physics_data = physics.PhysicsData(type, group)
+        self.update_rects()
+        group.add(self)
+
+    def update_rects(self):
+        self.rect.center = self.pos
+        self.collision_rect.center = self.pos
+
+
+class Trigger(Body):
+    def __init__(self, pos, group):
+        super().__init__(pos, group, physics.TYPE_TRIGGER, (40, 40))
+        self.hits = 0
+
+    def on_collision(self, body):
+        self.hits += 1
+
+
+def test_sleeping_body_still_hits_triggers():
+    group = broadphase.BroadphaseGroup()
+    trigger = Trigger((0, 0), group)
+    body = Body((0, 0), group)
+    for _ in range(120):
+        physics.dynamic_update(body, 1 / 60)
+    assert physics.is_sleeping(body)
+    assert trigger.hits == 120
+
+
+def test_trigger_moving_onto_sleeping_body_wakes_it():
+    group = broadphase.BroadphaseGroup()
+    body = Body((0, 0), group)
+    trigger = Trigger((200, 200), group)
+    for _ in range(60):
+        physics.dynamic_update(body, 1 / 60)
+    assert physics.is_sleeping(body)
+    trigger.pos.update(0, 0)
+    trigger.update_rects()
+    physics.moved(trigger)
+    physics.dynamic_update(body, 1 / 60)
+    assert trigger.hits == 1
+    assert not physics.is_sleeping(body)
+
+
+def test_bumped_sleeping_body_wakes():
+    group = broadphase.BroadphaseGroup()
+    body = Body((0, 0), group)
+    other = Body((30, 0), group)
+    for _ in range(60):
+        physics.dynamic_update(body, 1 / 60)
+    assert physics.is_sleeping(body)
+    other.velocity.x = -1500
+    physics.dynamic_update(other, 1 / 60)
+    assert not physics.is_sleeping(body)
+
+
+def test_teleport_wakes_body():
+    group = broadphase.BroadphaseGroup()
+    wall = pygame.sprite.Sprite()
+    wall.rect = pygame.Rect(100, 0, 50, 50)
+    wall.mask = pygame.Mask(wall.rect.size, True)
+    wall.physics_data = physics.PhysicsData(physics.TYPE_STATIC, group)
+    group.add(wall)
+    body = Body((0, 0), group)
+    world = physics.PhysicsWorld()
+    world.add(body)
+    for _ in range(60):
+        world.step_once()
+    assert physics.is_sleeping(body)
+    world.teleport(body, (110, 25))
+    world.step_once()
+    assert not body.collision_rect.colliderect(wall.rect)
@@ -0,0 +1,51 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from bush import animation
+from bush.mapping import group, tile_layer
+
+pygame.init()
+pygame.display.set_mode((64, 64))
+
+
+def make_tile():
+    tile = pygame.Surface((16, 16))
+    tile.fill((0, 200, 0))
+    return tile
+
+
+def test_tile_layer_stays_put_after_update():
+    layer = tile_layer.TileLayer((2048, 2048))
+    tile = make_tile()
+    for x in range(0, 2048, 16):
+        for y in range(0, 2048, 16):
+            layer.add_tile(tile, (x, y))
+    camera = group.CameraGroup((320, 240), (2048, 2048), (1500, 1500))
+    camera.add(layer)
+    surface = pygame.Surface((320, 240))
+    for _ in range(3):
+        camera.update(1 / 60)
+        surface.fill((0, 0, 0))
+        camera.draw(surface)
+    assert layer.rect == pygame.Rect(0, 0, 2048, 2048)
+    assert camera.visible_sprites() == [layer]
+    assert surface.get_at((160, 120))[:3] == (0, 200, 0)
+
+
+def test_animated_tile_layer_stays_put_after_update():
+    layer = tile_layer.AnimatedTileLayer((1024, 1024))
+    anim = animation.Animation([make_tile(), make_tile()], 100)
+    for x in range(0, 1024, 16):
+        layer.add_tile(1, anim, (x, 512))
+    camera = group.CameraGroup((320, 240), (1024, 1024), (800, 512))
+    camera.add(layer)
+    surface = pygame.Surface((320, 240))
+    for _ in range(3):
+        camera.update(1 / 60)
+        surface.fill((0, 0, 0))
+        camera.draw(surface)
+    assert layer.rect == pygame.Rect(0, 0, 1024, 1024)
+    assert surface.get_at((160, 125))[:3] == (0, 200, 0)